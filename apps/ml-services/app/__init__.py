@@ -1,6 +1,11 @@
+import time
 from flask import Flask
 from .config import Config
 from .registry import ServiceRegistry
+from .routes import metrics
+from .utils.metrics import metrics as app_metrics
+
+_import_time = time.monotonic()
 
 def create_app():
     app = Flask(__name__)
@@ -11,4 +16,8 @@ def create_app():
         raise ValueError(f"Unknown or unsupported SERVICE_TYPE: {Config.SERVICE_TYPE}")
     
     app.register_blueprint(service_blueprint)
+    app.register_blueprint(metrics.bp)
+
+    # Time from importing the app until it is ready to serve, including model loading
+    app_metrics.set_gauge("startup_seconds", time.monotonic() - _import_time)
     return app
@@ -3,7 +3,46 @@ import os
 class Config:
     SERVICE_TYPE = os.getenv("SERVICE_TYPE", "").lower()
     EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "openai/clip-vit-base-patch16")
+    EMBEDDING_MODEL_PATH = os.getenv("EMBEDDING_MODEL_PATH", "models/embedding")
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    EMBEDDING_INTRA_OP_THREADS = int(os.getenv("EMBEDDING_INTRA_OP_THREADS", 0))
+    EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "false").lower() == "true"
+    EMBEDDING_FAST_DECODE = os.getenv("EMBEDDING_FAST_DECODE", "false").lower() == "true"
     RECOGNITION_MODEL_REPO = os.getenv("RECOGNITION_MODEL_REPO", "ultralytics/yolov5")
     RECOGNITION_MODEL_NAME = os.getenv("RECOGNITION_MODEL_NAME", "yolov5s")
     EMBEDDING_VECTOR_DIM = int(os.getenv("EMBEDDING_VECTOR_DIM", 768))
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 16))
+    EMBEDDING_BATCH_MAX_ITEMS = int(os.getenv("EMBEDDING_BATCH_MAX_ITEMS", 256))
+    EMBEDDING_MICRO_BATCHING = os.getenv("EMBEDDING_MICRO_BATCHING", "false").lower() == "true"
+    EMBEDDING_MICRO_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_MICRO_BATCH_MAX_SIZE", 16))
+    EMBEDDING_MICRO_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MICRO_BATCH_MAX_WAIT_MS", 5))
+    TEXT_EMBEDDING_CACHE_SIZE = int(os.getenv("TEXT_EMBEDDING_CACHE_SIZE", 1024))
+    TEXT_EMBEDDING_CACHE_TTL = float(os.getenv("TEXT_EMBEDDING_CACHE_TTL", 24 * 60 * 60))
+    TEXT_EMBEDDING_CACHE_PATH = os.getenv("TEXT_EMBEDDING_CACHE_PATH", "")
+    IMAGE_EMBEDDING_CACHE_SIZE = int(os.getenv("IMAGE_EMBEDDING_CACHE_SIZE", 1024))
+    IMAGE_EMBEDDING_CACHE_TTL = float(os.getenv("IMAGE_EMBEDDING_CACHE_TTL", 7 * 24 * 60 * 60))
+    IMAGE_EMBEDDING_CACHE_PATH = os.getenv("IMAGE_EMBEDDING_CACHE_PATH", "")
+    IMAGE_BUFFER_SPOOL_SIZE = int(os.getenv("IMAGE_BUFFER_SPOOL_SIZE", 8 * 1024 * 1024))
+    HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 16))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+    HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 30))
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+    HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", 0.2))
+    HTTP_CHUNK_SIZE = int(os.getenv("HTTP_CHUNK_SIZE", 256 * 1024))
+    IMAGE_PREFETCH_DEPTH = int(os.getenv("IMAGE_PREFETCH_DEPTH", 8))
+    IMAGE_PREFETCH_MAX_BYTES = int(os.getenv("IMAGE_PREFETCH_MAX_BYTES", 64 * 1024 * 1024))
+    OUTPUT_FORMAT = os.getenv("OUTPUT_FORMAT", "jpeg").lower()
+    OUTPUT_QUALITY = int(os.getenv("OUTPUT_QUALITY", 75))
+    OUTPUT_JPEG_SUBSAMPLING = os.getenv("OUTPUT_JPEG_SUBSAMPLING", "4:2:0")
+    OUTPUT_JPEG_OPTIMIZE = os.getenv("OUTPUT_JPEG_OPTIMIZE", "false").lower() == "true"
+    OUTPUT_JPEG_PROGRESSIVE = os.getenv("OUTPUT_JPEG_PROGRESSIVE", "false").lower() == "true"
+    OUTPUT_KEEP_EXIF = os.getenv("OUTPUT_KEEP_EXIF", "true").lower() == "true"
+    OUTPUT_FAST_ENCODE = os.getenv("OUTPUT_FAST_ENCODE", "false").lower() == "true"
+    DETECTION_MAX_SIDE = int(os.getenv("DETECTION_MAX_SIDE", 1280))
+    DETECTION_TILING = os.getenv("DETECTION_TILING", "false").lower() == "true"
+    DETECTION_TILE_SIZE = int(os.getenv("DETECTION_TILE_SIZE", 1024))
+    DETECTION_TILE_OVERLAP = int(os.getenv("DETECTION_TILE_OVERLAP", 128))
+    DETECTION_TILE_WORKERS = int(os.getenv("DETECTION_TILE_WORKERS", 1))
+    DETECTION_POOL_SIZE = int(os.getenv("DETECTION_POOL_SIZE", os.getenv("THREADS", 1)))
+    BLUR_FEATHER = int(os.getenv("BLUR_FEATHER", 0))
     
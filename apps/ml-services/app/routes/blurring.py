@@ -7,6 +7,7 @@ from app.utils.image_loading_utils import (
     serve_image, 
     upload_image_and_respond
 )
+from app.utils.image_encoding_utils import get_encoding_options_from_request
 
 bp = Blueprint("blurring", __name__)
 
@@ -21,6 +22,7 @@ def blur_all():
     Optionally accepts an upload_url to store the processed image.
     """
     try:
+        encoding_options = get_encoding_options_from_request(request)
         image = get_image_from_request(request, image_loading_service)
         if image is None:
             return jsonify({"error": "Either 'image' file or 'url' must be provided, but not both"}), 400
@@ -29,10 +31,10 @@ def blur_all():
         
         upload_url = get_upload_url_from_request(request)
         if upload_url:
-            return upload_image_and_respond(blurred_image, upload_url, image_loading_service)
+            return upload_image_and_respond(blurred_image, upload_url, image_loading_service, encoding_options)
         else:
             # Return the processed image directly
-            return serve_image(blurred_image)
+            return serve_image(blurred_image, encoding_options)
             
     except ImageDownloadError as e:
         return jsonify({
@@ -48,6 +50,8 @@ def blur_all():
             "url": e.url if hasattr(e, 'url') else None,
             "status_code": e.status_code if hasattr(e, 'status_code') else None
         }), 422
+    except ValueError as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
@@ -59,18 +63,19 @@ def blur_faces():
     Optionally accepts an upload_url to store the processed image.
     """
     try:
+        encoding_options = get_encoding_options_from_request(request)
         image = get_image_from_request(request, image_loading_service)
         if image is None:
             return jsonify({"error": "Either 'image' file or 'url' must be provided, but not both"}), 400
         
-        blurred_image = blurring_service.blur_faces(image)
+        blurred_image = blurring_service.blur_faces(image, encoding_options)
         
         upload_url = get_upload_url_from_request(request)
         if upload_url:
-            return upload_image_and_respond(blurred_image, upload_url, image_loading_service)
+            return upload_image_and_respond(blurred_image, upload_url, image_loading_service, encoding_options)
         else:
             # Return the processed image directly
-            return serve_image(blurred_image)
+            return serve_image(blurred_image, encoding_options)
             
     except ImageDownloadError as e:
         return jsonify({
@@ -86,5 +91,7 @@ def blur_faces():
             "url": e.url if hasattr(e, 'url') else None,
             "status_code": e.status_code if hasattr(e, 'status_code') else None
         }), 422
+    except ValueError as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
\ No newline at end of file
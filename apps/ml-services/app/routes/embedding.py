@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from app.services.embedding_service import EmbeddingService
 from app.services.image_loading_service import ImageLoadingService, ImageDownloadError
-from app.utils.image_loading_utils import get_image_from_request
+from app.utils.image_loading_utils import get_image_from_request, get_batch_images_from_request
+from app.utils.embedding_response_utils import embedding_response
+from app.config import Config
 
 bp = Blueprint("embedding", __name__)
 
@@ -13,6 +15,7 @@ def embed_text():
     """
     Endpoint to create embeddings from text.
     Expects a JSON body with a 'text' field.
+    Responds with JSON by default or with the raw vector if application/octet-stream is accepted.
     """
     try:
         data = request.get_json()
@@ -20,8 +23,9 @@ def embed_text():
             return jsonify({"error": "Request must include a 'text' field"}), 400
             
         embedding = embedding_service.embed_text(data["text"])
-        dim = embedding.shape[0]
-        return jsonify({"dimension": dim, "embedding": embedding.tolist()})
+        return embedding_response(embedding, request)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
 
@@ -30,6 +34,7 @@ def embed_image():
     """
     Endpoint to create embeddings from images.
     Accepts either an image file upload or a URL to an image.
+    Responds with JSON by default or with the raw vector if application/octet-stream is accepted.
     """
     try:
         image = get_image_from_request(request, image_loading_service)
@@ -37,8 +42,7 @@ def embed_image():
             return jsonify({"error": "Either 'image' file or 'url' must be provided, but not both"}), 400
         
         embedding = embedding_service.embed_image(image)
-        dim = embedding.shape[0]
-        return jsonify({"dimension": dim, "embedding": embedding.tolist()})
+        return embedding_response(embedding, request)
         
     except ImageDownloadError as e:
         return jsonify({
@@ -52,4 +56,45 @@ def embed_image():
         return jsonify({"error": f"Invalid input: {str(e)}"}), 400
     except Exception as e:
         # Handle any other unexpected errors
-        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+@bp.route("/images/batch", methods=["POST"])
+def embed_images_batch():
+    """
+    Endpoint to create embeddings for many images in one request.
+    Accepts either multiple image file uploads under the 'images' field (keyed by filename)
+    or a JSON body with a 'urls' object mapping input ids to image URLs.
+    Failed inputs are reported per id instead of failing the whole batch.
+    """
+    try:
+        batch = get_batch_images_from_request(request, image_loading_service, Config.EMBEDDING_BATCH_MAX_ITEMS)
+        if batch is None:
+            return jsonify({"error": "Either 'images' files or a JSON 'urls' object must be provided"}), 400
+        images, errors = batch
+        
+        embeddings, embedding_errors = embedding_service.embed_images(images)
+        errors.update(embedding_errors)
+        
+        return jsonify({
+            "dimension": embedding_service.vector_dim,
+            "embeddings": {image_id: embedding.tolist() for image_id, embedding in embeddings.items()},
+            "errors": {image_id: _batch_error(e) for image_id, e in errors.items()}
+        })
+        
+    except ValueError as e:
+        return jsonify({"error": f"Invalid input: {str(e)}"}), 400
+    except Exception as e:
+        return jsonify({"error": f"An unexpected error occurred: {str(e)}"}), 500
+
+def _batch_error(e):
+    """Convert the exception of a single failed batch item into its JSON representation."""
+    if isinstance(e, ImageDownloadError):
+        return {
+            "error": "Image download failed",
+            "details": str(e),
+            "url": e.url,
+            "status_code": e.status_code
+        }
+    if isinstance(e, ValueError):
+        return {"error": f"Invalid input: {str(e)}"}
+    return {"error": f"An unexpected error occurred: {str(e)}"}
@@ -0,0 +1,11 @@
+from flask import Blueprint, jsonify
+from app.utils.metrics import metrics
+
+bp = Blueprint("metrics", __name__)
+
+@bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Endpoint exposing the in-process metrics of this worker as JSON.
+    """
+    return jsonify(metrics.snapshot())
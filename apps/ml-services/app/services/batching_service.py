@@ -0,0 +1,94 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from ..utils.metrics import metrics
+
+class MicroBatcher:
+    """
+    Coalesces concurrent calls into batches.
+    Pending items are collected until `max_batch_size` is reached or the oldest item has
+    waited `max_wait_ms`, then processed with a single call of `process_batch`.
+    Each caller receives the result at its own position of the batch.
+    """
+
+    def __init__(self, name, process_batch, max_batch_size, max_wait_ms):
+        """
+        Args:
+            name: Prefix of the metrics reported by this batcher
+            process_batch: Callable mapping a list of items to a sequence of results of the same length
+            max_batch_size: Maximum number of items processed together
+            max_wait_ms: Maximum time in milliseconds an item waits for further items
+        """
+        self.name = name
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def submit(self, item):
+        """
+        Process an item as part of the next batch and wait for its result
+
+        Args:
+            item: Single input passed to `process_batch`
+
+        Returns:
+            The result for this item
+
+        Raises:
+            Exception: Whatever `process_batch` raised for this item
+        """
+        self._ensure_worker()
+
+        future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        metrics.set_gauge(f"{self.name}_queue_depth", self._queue.qsize())
+        return future.result()
+
+    def _ensure_worker(self):
+        # The worker thread is started lazily so that it is also (re)started in forked processes
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f"{self.name}-batcher", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            now = time.monotonic()
+            metrics.set_gauge(f"{self.name}_queue_depth", self._queue.qsize())
+            metrics.observe(f"{self.name}_batch_size", len(batch))
+            for _, _, enqueued_at in batch:
+                metrics.observe(f"{self.name}_queue_wait_ms", (now - enqueued_at) * 1000.0)
+
+            self._process(batch)
+
+    def _process(self, batch):
+        try:
+            results = self.process_batch([item for item, _, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # retry items one by one so that a single bad input only fails its own caller
+            for entry in batch:
+                self._process([entry])
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
@@ -1,97 +1,117 @@
 from PIL import Image, ImageFilter
-import io
-import cv2
 import numpy as np
 from .detection_service import DetectionService
+from ..config import Config
+from ..utils.metrics import metrics
+from ..utils.region_blur import blur_regions
 
 class BlurringService:
     def __init__(self):
         """Initialize the blurring service with the detection service"""
         self.detection_service = DetectionService()
     
-    def full(self, image_file):
+    def full(self, image_buffer):
         """
         Apply full image blurring
         
         Args:
-            image_file: File-like object containing the image
+            image_buffer: ImageBuffer containing the image
             
         Returns:
             PIL Image with blur applied to the entire image
         """
-        image = self._get_image(image_file)
+        image = self._get_image(image_buffer)
         return image.filter(ImageFilter.GaussianBlur(radius=25))
     
-    def blur_faces(self, image_file):
+    def blur_faces(self, image_buffer, encoding_options):
         """
         Detect and blur all faces in the image
         
         Args:
-            image_file: File-like object containing the image
+            image_buffer: ImageBuffer containing the image
+            encoding_options: EncodingOptions of the output, which decide if an unchanged image can be passed on
             
         Returns:
-            PIL Image with blur applied to detected faces
+            PIL Image with blur applied to detected faces, or the unchanged image_buffer
+            if no faces were found and the original bytes can be passed on
         """
-        image_np = np.array(self._get_image(image_file))
+        image = self._get_image(image_buffer)
+        image_np = np.array(image)
         
         regions = self.detection_service.detect_faces(image_np)
+        if not regions:
+            return self._unchanged("blur_faces", image_buffer, image, encoding_options)
+        self._count_fast_path("blur_faces", False)
         
-        return self._blur_regions(image_np, regions)
+        return self._keep_metadata(self._blur_regions(image_np, regions), image)
     
         
-    def blur_all_sensitive(self, image_file):
+    def blur_all_sensitive(self, image_buffer, encoding_options):
         """
         Detect and blur all sensitive content: faces, license plates, and text
         
         Args:
-            image_file: File-like object containing the image
+            image_buffer: ImageBuffer containing the image
+            encoding_options: EncodingOptions of the output, which decide if an unchanged image can be passed on
             
         Returns:
-            PIL Image with blur applied to all detected sensitive regions
+            PIL Image with blur applied to all detected sensitive regions, or the
+            unchanged image_buffer if nothing was found and the original bytes can be passed on
         """
-        image_np = np.array(self._get_image(image_file))
+        image = self._get_image(image_buffer)
+        image_np = np.array(image)
         
         face_regions = self.detection_service.detect_faces(image_np)
         # TODO: add other sensitive content detection methods here
         
         all_regions = face_regions
+        if not all_regions:
+            return self._unchanged("blur_all_sensitive", image_buffer, image, encoding_options)
+        self._count_fast_path("blur_all_sensitive", False)
         
-        return self._blur_regions(image_np, all_regions)
+        return self._keep_metadata(self._blur_regions(image_np, all_regions), image)
     
-    def _blur_regions(self, image_np, regions, blur_kernel=(51, 51), sigma=30):
+    def _blur_regions(self, image_np, regions, sigma=30):
         """
-        Apply Gaussian blur to specific regions of an image
+        Apply Gaussian blur to specific regions of an image.
+        Overlapping regions are merged and regions of similar size are blurred in one pass.
         
         Args:
-            image_np: NumPy array of the image
+            image_np: NumPy array of the image, blurred in place (it must be a private copy)
             regions: List of tuples (x1, y1, x2, y2) defining regions to blur
-            blur_kernel: Tuple defining the blur kernel size
             sigma: Standard deviation for Gaussian blur
             
         Returns:
             PIL Image with blur applied to specified regions
         """
-        # Make a copy to avoid modifying the original
-        result_img = image_np.copy()
+        # np.array(image) already gave us a private buffer, so no further copy is needed
+        blur_regions(image_np, regions, sigma, feather=Config.BLUR_FEATHER)
         
-        for (x1, y1, x2, y2) in regions:
-            x1, y1 = max(0, x1), max(0, y1)
-            x2, y2 = min(image_np.shape[1], x2), min(image_np.shape[0], y2)
-            
-            if x2 <= x1 or y2 <= y1:
-                continue # -> invalid region
-                
-            roi = result_img[y1:y2, x1:x2]
-            
-            region_size = min(x2-x1, y2-y1)
-            adaptive_ksize = min(99, max(11, int(region_size * 0.15)))
-            adaptive_ksize = adaptive_ksize if adaptive_ksize % 2 == 1 else adaptive_ksize + 1
-            
-            blurred_roi = cv2.GaussianBlur(roi, (adaptive_ksize, adaptive_ksize), sigma)
-            result_img[y1:y2, x1:x2] = blurred_roi
-        
-        return Image.fromarray(result_img)
+        return Image.fromarray(image_np)
+    
+    def _get_image(self, image_buffer):
+        image = Image.open(image_buffer.open())
+        image_buffer.format = image.format
+        return image
+    
+    def _unchanged(self, name, image_buffer, image, encoding_options):
+        """
+        Output of an image without regions to blur: the original bytes if the encoding options allow it,
+        otherwise the already decoded image, so that it is re-encoded without decoding it again
+        """
+        fast_path = encoding_options.allows_pass_through(image.format, image.info)
+        self._count_fast_path(name, fast_path)
+        return image_buffer if fast_path else image
+    
+    
+    def _keep_metadata(self, result, source):
+        """Carry the EXIF data of the source image over to the result, the encoder keeps only the KEPT_EXIF_TAGS"""
+        if "exif" in source.info:
+            result.info["exif"] = source.info["exif"]
+        return result
     
-    def _get_image(self, image_file):
-        return Image.open(io.BytesIO(image_file.read()))
-    
\ No newline at end of file
+    def _count_fast_path(self, name, fast_path):
+        """Count the requests of `name` and the share of them that needed no blurring"""
+        requests = metrics.increment(f"{name}_requests")
+        fast_paths = metrics.increment(f"{name}_fast_path", 1 if fast_path else 0)
+        metrics.set_gauge(f"{name}_fast_path_ratio", fast_paths / requests)
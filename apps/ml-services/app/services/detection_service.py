@@ -1,19 +1,57 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import numpy as np
 import mediapipe as mp
 import torch
 import cv2
 from ..config import Config
+from ..utils.metrics import metrics
 
 class DetectionService:
     """Service responsible for detecting objects in images"""
     
     def __init__(self):
-        self.face_detector = mp.solutions.face_detection.FaceDetection(
+        self._detector_pool = None
+        self._detector_pool_pid = None
+        self._tile_executor = None
+        self._tile_executor_pid = None
+        self._lock = threading.Lock()  # guards the lazy creation of the pool and the executor
+
+        self.padding = 0.1 # 10% padding
+        # Longest side of the image detection runs on, 0 for the full resolution
+        self.max_side = Config.DETECTION_MAX_SIDE
+        # Tiled detection finds small faces in large images, which vanish when downscaling
+        self.tiling = Config.DETECTION_TILING
+        self.tile_size = Config.DETECTION_TILE_SIZE
+        self.tile_overlap = Config.DETECTION_TILE_OVERLAP
+        self.tile_workers = Config.DETECTION_TILE_WORKERS
+        self.nms_threshold = 0.5
+
+    @property
+    def detector_pool(self):
+        """
+        Pool of MediaPipe face detectors of the current process.
+        MediaPipe graphs must not be used by several threads at once, so every concurrent request
+        (and tile worker) checks out its own detector. The graphs run their own threads, which do not
+        survive a fork (e.g. gunicorn's preload mode), so the pool is created lazily in every process,
+        under a lock, so that concurrent first requests share one pool.
+        """
+        if self._detector_pool is None or self._detector_pool_pid != os.getpid():
+            with self._lock:
+                if self._detector_pool is None or self._detector_pool_pid != os.getpid():
+                    self._detector_pool = DetectorPool(self._create_face_detector, Config.DETECTION_POOL_SIZE)
+                    self._detector_pool_pid = os.getpid()
+        return self._detector_pool
+    
+    def _create_face_detector(self):
+        return mp.solutions.face_detection.FaceDetection(
             model_selection=1,  # 0 for close-range, 1 for mid-range detection
             min_detection_confidence=0.5
         )
-
-        self.padding = 0.1 # 10% padding
     
     def detect_faces(self, image_np):
         """
@@ -25,36 +63,198 @@ class DetectionService:
         Returns:
             List of regions (x1, y1, x2, y2) of detected faces
         """
-        # ensure RGB for MediaPipe
-        if len(image_np.shape) == 2:  # Grayscale
-            image_rgb = cv2.cvtColor(image_np, cv2.COLOR_GRAY2RGB)
-        elif image_np.shape[2] == 4:  # RGBA
-            image_rgb = cv2.cvtColor(image_np, cv2.COLOR_RGBA2RGB)
-        else:
-            image_rgb = image_np  # -> already RGB
+        h, w = image_np.shape[:2] # dimensions of the full resolution image
+        
+        with self.detector_pool.checkout() as detector:
+            boxes = self._detect_boxes(image_np, detector)
+        if self.tiling and max(h, w) > self.tile_size:
+            # The global pass finds faces larger than a tile, the tiles the small ones
+            boxes = non_max_suppression(boxes + self._detect_tiled(image_np), self.nms_threshold)
         
         regions = []
-        results = self.face_detector.process(image_rgb)
+        for x1, y1, x2, y2, _ in boxes:
+            padding = int(min(x2 - x1, y2 - y1) * self.padding)
+            x1_padded = max(0, x1 - padding)
+            y1_padded = max(0, y1 - padding)
+            x2_padded = min(w, x2 + padding)
+            y2_padded = min(h, y2 + padding)
+            
+            regions.append((x1_padded, y1_padded, x2_padded, y2_padded))
+        
+        return regions
+    
+    def _detect_boxes(self, image_np, detector, offset=(0, 0)):
+        """
+        Run a detector on an image (or a tile of it)
         
+        Args:
+            image_np: NumPy array of the image
+            detector: MediaPipe face detector
+            offset: (x, y) position of the image within the full image
+            
+        Returns:
+            List of unpadded boxes (x1, y1, x2, y2, score) in full resolution coordinates
+        """
+        h, w = image_np.shape[:2]
+        
+        # MediaPipe downscales internally anyway, so detect on a small copy.
+        # Bounding boxes are relative, so they map back to the full resolution directly.
+        results = detector.process(self._prepare_image(image_np))
+        
+        boxes = []
         if results.detections:
-            h, w = image_np.shape[:2] # dimensions
             for detection in results.detections:
                 bbox = detection.location_data.relative_bounding_box
                 
                 x = max(0, int(bbox.xmin * w))
                 y = max(0, int(bbox.ymin * h))
-                width = int(bbox.width * w)
-                height = int(bbox.height * h)
-                
-                x2 = min(w, x + width)
-                y2 = min(h, y + height)
-                
-                padding = int(min(width, height) * self.padding)
-                x1_padded = max(0, x - padding)
-                y1_padded = max(0, y - padding)
-                x2_padded = min(w, x2 + padding)
-                y2_padded = min(h, y2 + padding)
+                x2 = min(w, x + int(bbox.width * w))
+                y2 = min(h, y + int(bbox.height * h))
+                if x2 <= x or y2 <= y:
+                    continue
                 
-                regions.append((x1_padded, y1_padded, x2_padded, y2_padded))
+                boxes.append((x + offset[0], y + offset[1], x2 + offset[0], y2 + offset[1], detection.score[0]))
         
-        return regions
\ No newline at end of file
+        return boxes
+    
+    def _detect_tiled(self, image_np):
+        """Detect faces on overlapping full resolution tiles, optionally across a thread pool"""
+        h, w = image_np.shape[:2]
+        tiles = [
+            (x, y) for y in tile_starts(h, self.tile_size, self.tile_overlap)
+            for x in tile_starts(w, self.tile_size, self.tile_overlap)
+        ]
+        
+        def detect_tile(position):
+            x, y = position
+            tile = image_np[y:y + self.tile_size, x:x + self.tile_size]
+            with self.detector_pool.checkout() as detector:
+                return self._detect_boxes(tile, detector, offset=(x, y))
+        
+        if self.tile_workers > 1:
+            results = self._get_tile_executor().map(detect_tile, tiles)
+        else:
+            results = map(detect_tile, tiles)
+        return [box for boxes in results for box in boxes]
+    
+    def _get_tile_executor(self):
+        """Thread pool of the tile workers, created lazily in every process like the detectors"""
+        if self._tile_executor is None or self._tile_executor_pid != os.getpid():
+            with self._lock:
+                if self._tile_executor is None or self._tile_executor_pid != os.getpid():
+                    self._tile_executor = ThreadPoolExecutor(max_workers=self.tile_workers,
+                                                             thread_name_prefix="detection-tile")
+                    self._tile_executor_pid = os.getpid()
+        return self._tile_executor
+    
+    def _prepare_image(self, image_np):
+        """
+        Downscale the image to at most max_side pixels on its longest side and convert it to RGB.
+        Downscaling first means the color conversion only touches the small image.
+        """
+        h, w = image_np.shape[:2]
+        scale = self.max_side / max(h, w) if self.max_side > 0 else 1.0
+        if scale < 1.0:
+            size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            image_np = cv2.resize(image_np, size, interpolation=cv2.INTER_AREA)
+        
+        # ensure RGB for MediaPipe
+        if len(image_np.shape) == 2:  # Grayscale
+            return cv2.cvtColor(image_np, cv2.COLOR_GRAY2RGB)
+        elif image_np.shape[2] == 4:  # RGBA
+            return cv2.cvtColor(image_np, cv2.COLOR_RGBA2RGB)
+        return image_np  # -> already RGB
+
+class DetectorPool:
+    """
+    Fixed-size pool of detectors shared between threads. Detectors are created on first demand
+    up to `size`; when all are checked out, further threads wait for one to be checked in.
+    """
+    
+    def __init__(self, factory, size):
+        self._factory = factory
+        self._size = max(1, size)
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+    
+    @contextmanager
+    def checkout(self):
+        """Context manager lending a detector to the calling thread for the duration of the block"""
+        detector = self._acquire()
+        try:
+            yield detector
+        finally:
+            self._idle.put(detector)
+    
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._lock:
+            create = self._created < self._size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return self._factory()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        
+        start = time.perf_counter()
+        detector = self._idle.get()
+        metrics.observe("detector_pool_wait_ms", (time.perf_counter() - start) * 1000.0)
+        return detector
+
+def tile_starts(length, tile_size, overlap):
+    """Start offsets of tiles of tile_size covering length, overlapping by at least overlap"""
+    if length <= tile_size:
+        return [0]
+    stride = max(1, tile_size - overlap)
+    starts = list(range(0, length - tile_size + 1, stride))
+    if starts[-1] + tile_size < length:
+        starts.append(length - tile_size)
+    return starts
+
+def non_max_suppression(boxes, threshold):
+    """
+    Merge duplicate detections, e.g. of a face in the overlap of two tiles or found by both
+    the global and a tile pass. Boxes are visited by descending score and dropped if they overlap
+    an already kept box by more than threshold of the smaller box's area. The kept box grows to
+    the union of the boxes it suppresses, so that a partial detection of a face cut by a tile
+    border cannot shrink the blurred area.
+    
+    Args:
+        boxes: List of boxes (x1, y1, x2, y2, score)
+        threshold: Maximum overlap relative to the smaller box
+        
+    Returns:
+        List of merged boxes
+    """
+    if not boxes:
+        return []
+    
+    array = np.array(boxes, dtype=np.float64)
+    x1, y1, x2, y2, scores = array.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores)
+    
+    merged = []
+    while order.size > 0:
+        i = order[0]
+        rest = order[1:]
+        overlap_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        overlap_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        overlap = overlap_w * overlap_h / np.minimum(areas[i], areas[rest])
+        
+        group = np.concatenate(([i], rest[overlap > threshold]))
+        merged.append((
+            int(x1[group].min()), int(y1[group].min()), int(x2[group].max()), int(y2[group].max()), float(scores[i])
+        ))
+        order = rest[overlap <= threshold]
+    
+    return merged
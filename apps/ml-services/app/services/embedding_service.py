@@ -1,51 +1,220 @@
 import torch
 import numpy as np
 from PIL import Image
-from transformers import CLIPProcessor, CLIPModel
-import io
+from transformers import CLIPProcessor
+import hashlib
+import os
+import time
 from ..config import Config
+from ..utils.cache import EmbeddingCache
+from ..utils.image_decoding_utils import ClipPreprocessing, decode_image_for_clip
+from ..utils.metrics import metrics
+from .batching_service import MicroBatcher
+from .inference_backends import create_backend
 
 class EmbeddingService:
     def __init__(self):
-        # Preload and cache models during the service initialization
-        CLIPModel.from_pretrained(Config.EMBEDDING_MODEL_NAME)
-        CLIPProcessor.from_pretrained(Config.EMBEDDING_MODEL_NAME)
-        
-        self.model, self.processor = self._load_clip_model()
-        self.dimension = self.model.config.projection_dim
+        self.backend, self.processor = self._load_clip_model()
+        self.preprocessing = ClipPreprocessing(self.processor) if Config.EMBEDDING_FAST_DECODE else None
         self.vector_dim = Config.EMBEDDING_VECTOR_DIM
+        self.batch_size = Config.EMBEDDING_BATCH_SIZE
 
-    def _prefetch_models(self):
-        """Preload models to ensure they are cached on disk."""
-        print("Prefetching the CLIP model and processor...")
-        CLIPModel.from_pretrained(Config.EMBEDDING_MODEL_NAME)
-        CLIPProcessor.from_pretrained(Config.EMBEDDING_MODEL_NAME)
-        print("CLIP model and processor preloaded successfully.")
+        self.text_cache = None
+        if Config.TEXT_EMBEDDING_CACHE_SIZE > 0:
+            self.text_cache = EmbeddingCache(
+                "text_embedding", Config.TEXT_EMBEDDING_CACHE_SIZE,
+                Config.TEXT_EMBEDDING_CACHE_TTL, Config.TEXT_EMBEDDING_CACHE_PATH
+            )
+        self.image_cache = None
+        if Config.IMAGE_EMBEDDING_CACHE_SIZE > 0:
+            self.image_cache = EmbeddingCache(
+                "image_embedding", Config.IMAGE_EMBEDDING_CACHE_SIZE,
+                Config.IMAGE_EMBEDDING_CACHE_TTL, Config.IMAGE_EMBEDDING_CACHE_PATH
+            )
+
+        # Optionally coalesce concurrent single-item requests into batched forward passes
+        self.text_batcher = None
+        self.image_batcher = None
+        if Config.EMBEDDING_MICRO_BATCHING:
+            self.text_batcher = MicroBatcher(
+                "embedding_text", self._text_features,
+                Config.EMBEDDING_MICRO_BATCH_MAX_SIZE, Config.EMBEDDING_MICRO_BATCH_MAX_WAIT_MS
+            )
+            self.image_batcher = MicroBatcher(
+                "embedding_image", self._image_features,
+                Config.EMBEDDING_MICRO_BATCH_MAX_SIZE, Config.EMBEDDING_MICRO_BATCH_MAX_WAIT_MS
+            )
 
     def _load_clip_model(self):
-        """Load the CLIP model and processor from the cache."""
-        model = CLIPModel.from_pretrained(Config.EMBEDDING_MODEL_NAME)
-        processor = CLIPProcessor.from_pretrained(Config.EMBEDDING_MODEL_NAME)
-        return model, processor
+        """
+        Load the inference backend and processor exactly once.
+        Prefers the safetensors export written by fetch_deps.py at build time, whose weights are
+        memory-mapped instead of unpickled, and falls back to the Hugging Face cache otherwise.
+        The TorchScript and ONNX backends load the towers exported by fetch_deps.py instead.
+        """
+        source = Config.EMBEDDING_MODEL_NAME
+        if os.path.isfile(os.path.join(Config.EMBEDDING_MODEL_PATH, "model.safetensors")):
+            source = Config.EMBEDDING_MODEL_PATH
+
+        start = time.perf_counter()
+        backend = create_backend(
+            Config.EMBEDDING_BACKEND, source, Config.EMBEDDING_MODEL_PATH,
+            Config.EMBEDDING_INTRA_OP_THREADS, Config.EMBEDDING_QUANTIZE
+        )
+        processor = CLIPProcessor.from_pretrained(source)
+        load_seconds = time.perf_counter() - start
+
+        metrics.set_gauge("embedding_model_load_seconds", load_seconds)
+        precision = "int8" if Config.EMBEDDING_QUANTIZE else "fp32"
+        print(f"Loaded {Config.EMBEDDING_BACKEND} ({precision}) backend and CLIP processor from {source} in {load_seconds:.2f}s")
+        return backend, processor
 
     def embed_text(self, text):
-        inputs = self.processor(text=text, return_tensors="pt", padding=True)
-        with torch.no_grad():
-            embeddings = self.model.get_text_features(**inputs)
-        # Remove batch dimension and convert to fixed dimension
-        return self._convert_to_fixed_dim(embeddings.squeeze(0))
-
-    def embed_image(self, image_file):
-        image = Image.open(io.BytesIO(image_file.read()))
-        inputs = self.processor(images=image, return_tensors="pt")
-        with torch.no_grad():
-            embeddings = self.model.get_image_features(**inputs)
-        # Remove batch dimension and convert to fixed dimension
-        return self._convert_to_fixed_dim(embeddings.squeeze(0))
+        if self.text_cache is None or not isinstance(text, str):
+            return self._embed_text_uncached(text)
+
+        key = self._text_cache_key(text)
+        embedding = self.text_cache.get(key)
+        if embedding is None:
+            embedding = self._embed_text_uncached(text)
+            self.text_cache.put(key, embedding)
+        return embedding
+
+    def _embed_text_uncached(self, text):
+        if self.text_batcher is not None and isinstance(text, str):
+            return self.text_batcher.submit(text)
+        embeddings = self._text_features([text] if isinstance(text, str) else text)
+        # Remove batch dimension
+        return embeddings[0] if len(embeddings) == 1 else embeddings
+
+    def embed_image(self, image_buffer):
+        # Look up the raw bytes before spending any time on decoding
+        key = None
+        if self.image_cache is not None:
+            key = self._image_cache_key(image_buffer.view)
+            embedding = self.image_cache.get(key)
+            if embedding is not None:
+                return embedding
+
+        image = self._load_image(image_buffer)
+        if self.image_batcher is not None:
+            embedding = self.image_batcher.submit(image)
+        else:
+            # Remove batch dimension
+            embedding = self._image_features([image])[0]
+
+        if key is not None:
+            self.image_cache.put(key, embedding)
+        return embedding
+
+    def embed_images(self, image_buffers):
+        """
+        Create embeddings for many images, running the model in batches
+        of at most `batch_size` images per forward pass.
+        Images found in the image embedding cache are neither decoded nor embedded again.
+
+        Args:
+            image_buffers: Dict mapping an input id to the ImageBuffer of the image, or an
+                iterable of (id, ImageBuffer) pairs that is consumed one batch at a time
+
+        Returns:
+            Tuple (embeddings, errors): embeddings maps input ids to their embedding,
+            errors maps the ids of failed inputs to the exception that occurred
+        """
+        embeddings = {}
+        errors = {}
+        # (id, cache key, decoded image) of the images of the next forward pass,
+        # decoded per batch so only one batch of images is held in memory
+        pending = []
+
+        def flush():
+            try:
+                batch_embeddings = self._image_features([image for _, _, image in pending])
+            except Exception as e:
+                for image_id, _, _ in pending:
+                    errors[image_id] = e
+            else:
+                for (image_id, key, _), embedding in zip(pending, batch_embeddings):
+                    embeddings[image_id] = embedding
+                    if key is not None:
+                        self.image_cache.put(key, embedding)
+            pending.clear()
+
+        if isinstance(image_buffers, dict):
+            image_buffers = image_buffers.items()
+
+        for image_id, image_buffer in image_buffers:
+            key = None
+            if self.image_cache is not None:
+                key = self._image_cache_key(image_buffer.view)
+                embedding = self.image_cache.get(key)
+                if embedding is not None:
+                    embeddings[image_id] = embedding
+                    continue
+
+            try:
+                pending.append((image_id, key, self._load_image(image_buffer)))
+            except Exception as e:
+                errors[image_id] = ValueError(f"Could not decode image: {str(e)}")
+                continue
+
+            if len(pending) == self.batch_size:
+                flush()
+
+        if pending:
+            flush()
+
+        return embeddings, errors
+
+    def _text_cache_key(self, text):
+        """
+        Cache key of a text. The CLIP tokenizer lowercases the text and collapses whitespace,
+        so texts that only differ therein share the same embedding.
+        """
+        normalized = " ".join(text.split()).lower()
+        return self._cache_key(normalized.encode("utf-8"))
+
+    def _image_cache_key(self, data):
+        """Content address of an image: a hash of its raw (still encoded) bytes."""
+        return self._cache_key(data)
+
+    def _cache_key(self, content):
+        """Hash the content together with everything else that determines the resulting embedding."""
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(
+            f"{Config.EMBEDDING_MODEL_NAME}|{Config.EMBEDDING_BACKEND}|{Config.EMBEDDING_QUANTIZE}|"
+            f"{Config.EMBEDDING_FAST_DECODE}|{self.vector_dim}|".encode("utf-8")
+        )
+        digest.update(content)
+        return digest.hexdigest()
+
+    def _text_features(self, texts):
+        """Run the text tower on a list of texts and return one fixed dimension embedding per row."""
+        inputs = self.processor(text=texts, return_tensors="pt", padding=self.backend.text_padding)
+        return self._convert_to_fixed_dim(self.backend.text_features(inputs))
+
+    def _image_features(self, images):
+        """Run the vision tower on a list of images loaded by _load_image and return one fixed dimension embedding per row."""
+        if self.preprocessing is not None:
+            inputs = {"pixel_values": torch.from_numpy(np.stack(images))}
+        else:
+            inputs = self.processor(images=images, return_tensors="pt")
+        return self._convert_to_fixed_dim(self.backend.image_features(inputs))
+
+    def _load_image(self, image_buffer):
+        """
+        Decode an image eagerly so that corrupt inputs fail here and not inside the batch.
+        Returns a PIL image, or the preprocessed pixel values in fast decode mode.
+        """
+        if self.preprocessing is not None:
+            return decode_image_for_clip(image_buffer.open(), self.preprocessing)
+        image = Image.open(image_buffer.open())
+        return image.convert("RGB")
 
     def _convert_to_fixed_dim(self, embeddings):
         """
-        Convert embeddings to a fixed dimension and normalize them
+        Convert embeddings to a fixed dimension and normalize them.
+        Accepts a single embedding or a batch of embeddings (one per row).
         """
         target_dim = self.vector_dim
         original_dim = embeddings.shape[-1]
@@ -54,11 +223,11 @@ class EmbeddingService:
             result = embeddings[..., :target_dim]
         elif original_dim < target_dim:  # pad with zeros
             padding_size = target_dim - original_dim
-            padding = torch.zeros(padding_size, device=embeddings.device, dtype=embeddings.dtype)
+            padding = torch.zeros(*embeddings.shape[:-1], padding_size, device=embeddings.device, dtype=embeddings.dtype)
             result = torch.cat([embeddings, padding], dim=-1)
         else:  # no change
             result = embeddings
 
         result = torch.nn.functional.normalize(result, p=2, dim=-1)  # L2 normalization
 
-        return result.cpu().numpy().flatten()
+        return result.cpu().numpy()
@@ -1,6 +1,13 @@
 import io
-import requests
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse
+from ..config import Config
+from ..utils.image_buffer import ImageBuffer
+from ..utils.http_client import create_session, send_with_retries
+from ..utils.metrics import metrics
 
 class ImageUploadError(Exception):
     """Exception raised when an image upload operation fails."""
@@ -48,7 +55,14 @@ class ImageLoadingService:
         Initialize the image service.
         No credentials needed as we'll be using pre-signed URLs.
         """
-        self.session = requests.Session()
+        self.session = create_session()
+        
+        # Connection pools must not be shared with the parent process, e.g. with gunicorn's preload mode
+        os.register_at_fork(after_in_child=self._reset_session)
+    
+    def _reset_session(self):
+        """Replace the HTTP session with a fresh one"""
+        self.session = create_session()
     
     def upload_image(self, url, file_obj):
         """
@@ -56,7 +70,7 @@ class ImageLoadingService:
         
         Args:
             url (str): HTTP URL for upload (pre-signed Minio URL)
-            file_obj: File-like object containing the image data
+            file_obj: Seekable file-like object containing the image data, streamed without copying it
             
         Returns:
             bool: True if upload was successful
@@ -65,17 +79,23 @@ class ImageLoadingService:
             ImageUploadError: If the upload operation fails
         """
         try:
-            # Read file content
+            # Determine the size up front, so the body is streamed from the file object
+            # with a Content-Length instead of being read into another buffer first
+            file_obj.seek(0, io.SEEK_END)
+            content_length = file_obj.tell()
             file_obj.seek(0)
-            file_content = file_obj.read()
             
             # Use PUT request for uploading to pre-signed URL
-            response = self.session.put(
+            response = send_with_retries(
+                self.session,
+                'PUT',
                 url,
-                data=file_content,
+                data=file_obj,
                 headers={
-                    'Content-Type': 'application/octet-stream'
-                }
+                    'Content-Type': 'application/octet-stream',
+                    'Content-Length': str(content_length)
+                },
+                before_retry=lambda: file_obj.seek(0)
             )
             
             # Check if the upload was successful
@@ -105,27 +125,27 @@ class ImageLoadingService:
             url (str): HTTP URL of the image to download (pre-signed Minio URL)
             
         Returns:
-            io.BytesIO: File-like object containing the downloaded image
+            ImageBuffer: The downloaded image, buffered once
             
         Raises:
             ImageDownloadError: If the download operation fails
         """
         try:
             # Use GET request to download from URL
-            response = self.session.get(url, stream=True)
+            response = send_with_retries(self.session, 'GET', url, stream=True)
             
             # Check if the download was successful
             if response.status_code == 200:
-                # Create a file-like object to store the downloaded image
-                file_obj = io.BytesIO()
+                # Preallocate the buffer from the Content-Length if the server sent one.
+                # With a Content-Encoding it is the compressed size, which iter_content does not yield.
+                content_length = response.headers.get('Content-Length')
+                if content_length is not None and (not content_length.isdigit() or 'Content-Encoding' in response.headers):
+                    content_length = None
                 
-                # Write the content to the file-like object
-                for chunk in response.iter_content(chunk_size=8192):
-                    file_obj.write(chunk)
-                
-                # Reset the file pointer to the beginning of the file
-                file_obj.seek(0)
-                return file_obj
+                return ImageBuffer.from_chunks(
+                    response.iter_content(chunk_size=Config.HTTP_CHUNK_SIZE),
+                    int(content_length) if content_length is not None else None
+                )
             else:
                 print(f"Download failed with status code: {response.status_code}")
                 print(f"Response: {response.text}")
@@ -140,4 +160,56 @@ class ImageLoadingService:
             raise
         except Exception as e:
             print(f"Error downloading image: {str(e)}")
-            raise ImageDownloadError(url=url, original_exception=e) from e
\ No newline at end of file
+            raise ImageDownloadError(url=url, original_exception=e) from e
+    
+    def prefetch_images(self, urls, depth=None, max_bytes=None):
+        """
+        Download images in the background while the caller processes the previous ones.
+        Up to `depth` downloads run concurrently; no new download is started while the
+        downloaded but not yet consumed images hold `max_bytes` or more, so memory stays
+        bounded by roughly max_bytes plus `depth` images however slow the consumer is.
+        
+        Args:
+            urls (dict): Mapping of input ids to HTTP URLs
+            depth (int): Number of concurrent downloads, defaults to IMAGE_PREFETCH_DEPTH
+            max_bytes (int): Budget of buffered bytes, defaults to IMAGE_PREFETCH_MAX_BYTES
+            
+        Yields:
+            Tuple (image_id, result) in the order of `urls`, the result being the ImageBuffer
+            or the ImageDownloadError of the download
+        """
+        depth = depth or Config.IMAGE_PREFETCH_DEPTH
+        max_bytes = max_bytes or Config.IMAGE_PREFETCH_MAX_BYTES
+        remaining = iter(urls.items())
+        pending = deque()  # (image_id, future) in input order
+        executor = ThreadPoolExecutor(max_workers=depth, thread_name_prefix="image-prefetch")
+        
+        def buffered_bytes():
+            return sum(
+                len(future.result()) for _, future in pending
+                if future.done() and future.exception() is None
+            )
+        
+        def fill():
+            while len(pending) < depth and buffered_bytes() < max_bytes:
+                item = next(remaining, None)
+                if item is None:
+                    return
+                image_id, url = item
+                pending.append((image_id, executor.submit(self.download_image, url)))
+        
+        try:
+            fill()
+            while pending:
+                image_id, future = pending.popleft()
+                start = time.perf_counter()
+                try:
+                    result = future.result()
+                except ImageDownloadError as e:
+                    result = e
+                metrics.observe("image_prefetch_wait_ms", (time.perf_counter() - start) * 1000.0)
+                # Start the next downloads before handing out the image, so they overlap with its processing
+                fill()
+                yield image_id, result
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,138 @@
+import os
+import threading
+import numpy as np
+import torch
+from transformers import CLIPModel
+
+def exported_model_file(tower, extension, quantized=False):
+    """
+    File name of an exported tower, as written by fetch_deps.py into EMBEDDING_MODEL_PATH
+
+    Args:
+        tower: 'text' or 'image'
+        extension: 'pt' for TorchScript or 'onnx'
+        quantized: Whether to use the dynamically int8 quantised variant
+    """
+    return f"{tower}_model{'.int8' if quantized else ''}.{extension}"
+
+class TorchBackend:
+    """Eager PyTorch inference on the Hugging Face CLIP model"""
+
+    # Texts only need to be padded to the longest text of a batch
+    text_padding = True
+
+    def __init__(self, source, quantize=False):
+        self.model = CLIPModel.from_pretrained(source)
+        if quantize:
+            # Dynamic quantisation only converts the weights, so it is quick enough to do at startup
+            self.model = torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    def text_features(self, inputs):
+        with torch.no_grad():
+            return self.model.get_text_features(
+                input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]
+            )
+
+    def image_features(self, inputs):
+        with torch.no_grad():
+            return self.model.get_image_features(pixel_values=inputs["pixel_values"])
+
+class TorchScriptBackend:
+    """Inference on the traced and frozen TorchScript towers exported at build time"""
+
+    # The towers are traced on inputs padded to the tokenizer's maximum length
+    text_padding = "max_length"
+
+    def __init__(self, model_path, quantize=False):
+        self.text_model = torch.jit.load(os.path.join(model_path, exported_model_file("text", "pt", quantize)))
+        self.image_model = torch.jit.load(os.path.join(model_path, exported_model_file("image", "pt", quantize)))
+
+    def text_features(self, inputs):
+        with torch.no_grad():
+            return self.text_model(inputs["input_ids"], inputs["attention_mask"])
+
+    def image_features(self, inputs):
+        with torch.no_grad():
+            return self.image_model(inputs["pixel_values"])
+
+class OnnxBackend:
+    """Inference on the ONNX towers exported at build time, run by ONNX Runtime with all graph optimisations"""
+
+    # The towers are exported on inputs padded to the tokenizer's maximum length
+    text_padding = "max_length"
+
+    def __init__(self, model_path, intra_op_threads=0, quantize=False):
+        self.text_model_file = os.path.join(model_path, exported_model_file("text", "onnx", quantize))
+        self.image_model_file = os.path.join(model_path, exported_model_file("image", "onnx", quantize))
+        for model_file in (self.text_model_file, self.image_model_file):
+            if not os.path.isfile(model_file):
+                # Fail at startup, the sessions themselves are only created on first use
+                raise FileNotFoundError(f"Exported ONNX model not found: {model_file}")
+        self.intra_op_threads = intra_op_threads
+        self._sessions = None
+        self._sessions_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def sessions(self):
+        """
+        (text session, image session) of the current process. ONNX Runtime's thread pools do not
+        survive a fork (e.g. gunicorn's preload mode), so the sessions are created lazily in every process.
+        """
+        with self._lock:
+            if self._sessions is None or self._sessions_pid != os.getpid():
+                import onnxruntime as ort
+
+                options = ort.SessionOptions()
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                if self.intra_op_threads > 0:
+                    options.intra_op_num_threads = self.intra_op_threads
+
+                providers = ["CPUExecutionProvider"]
+                self._sessions = (
+                    ort.InferenceSession(self.text_model_file, options, providers=providers),
+                    ort.InferenceSession(self.image_model_file, options, providers=providers),
+                )
+                self._sessions_pid = os.getpid()
+            return self._sessions
+
+    def text_features(self, inputs):
+        outputs = self.sessions[0].run(None, {
+            "input_ids": inputs["input_ids"].numpy().astype(np.int64),
+            "attention_mask": inputs["attention_mask"].numpy().astype(np.int64),
+        })
+        return torch.from_numpy(outputs[0])
+
+    def image_features(self, inputs):
+        outputs = self.sessions[1].run(None, {
+            "pixel_values": inputs["pixel_values"].numpy().astype(np.float32),
+        })
+        return torch.from_numpy(outputs[0])
+
+def create_backend(name, source, model_path, intra_op_threads=0, quantize=False):
+    """
+    Create the inference backend used by the EmbeddingService
+
+    Args:
+        name: 'torch' (eager), 'torchscript' or 'onnx'
+        source: Model name or directory the eager model is loaded from
+        model_path: Directory containing the towers exported by fetch_deps.py
+        intra_op_threads: Number of threads per operator, 0 keeps the library default
+        quantize: Whether to run the Linear layers with dynamic int8 quantisation
+
+    Returns:
+        Backend with text_features(inputs) and image_features(inputs) returning torch tensors
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if name in ("torch", "torchscript") and intra_op_threads > 0:
+        torch.set_num_threads(intra_op_threads)
+
+    if name == "torch":
+        return TorchBackend(source, quantize)
+    if name == "torchscript":
+        return TorchScriptBackend(model_path, quantize)
+    if name == "onnx":
+        return OnnxBackend(model_path, intra_op_threads, quantize)
+    raise ValueError(f"Unknown embedding backend: {name}")
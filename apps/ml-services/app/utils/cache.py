@@ -0,0 +1,136 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from .metrics import metrics
+
+class LRUCache:
+    """Thread-safe in-memory cache evicting the least recently used entries and entries older than the TTL"""
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class SqliteEmbeddingStore:
+    """
+    Embedding store in a SQLite file shared by all worker processes.
+    Placing the file on tmpfs (e.g. /dev/shm) gives a shared-memory store that survives worker
+    recycling, placing it on disk additionally survives restarts.
+    Entries older than the TTL are ignored and the oldest entries are evicted beyond max_entries.
+    """
+
+    _EVICTION_INTERVAL = 100  # writes between two size evictions
+
+    def __init__(self, path, table, max_entries, ttl_seconds):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._writes = 0
+
+        with self._connection() as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_created_at ON {self.table} (created_at)")
+
+    def _connection(self):
+        # SQLite connections can neither be shared between threads nor inherited by forked processes
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            f"SELECT value FROM {self.table} WHERE key = ? AND created_at >= ?",
+            (key, time.time() - self.ttl_seconds)
+        ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put(self, key, value):
+        connection = self._connection()
+        connection.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+            (key, np.asarray(value, dtype=np.float32).tobytes(), time.time())
+        )
+
+        self._writes += 1
+        if self._writes % self._EVICTION_INTERVAL == 0:
+            connection.execute(f"DELETE FROM {self.table} WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            connection.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache: a per-process LRU cache, optionally backed by a SQLite store
+    shared between processes. Reports hits and misses as `<name>_cache_hits` / `<name>_cache_misses`.
+    """
+
+    def __init__(self, name, max_entries, ttl_seconds, path=None):
+        """
+        Args:
+            name: Name of the cache, used for metrics and as table name of the shared store
+            max_entries: Maximum number of embeddings kept per tier
+            ttl_seconds: Time after which cached embeddings expire
+            path: Optional path of the SQLite file of the shared store
+        """
+        self.name = name
+        self.memory = LRUCache(max_entries, ttl_seconds)
+        self.store = SqliteEmbeddingStore(path, name, max_entries, ttl_seconds) if path else None
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.store is not None:
+            try:
+                value = self.store.get(key)
+            except sqlite3.Error as e:
+                print(f"Error reading from the {self.name} cache store: {str(e)}")
+            if value is not None:
+                self.memory.put(key, value)
+
+        metrics.increment(f"{self.name}_cache_hits" if value is not None else f"{self.name}_cache_misses")
+        return value
+
+    def put(self, key, value):
+        value = np.asarray(value, dtype=np.float32)
+        value.setflags(write=False)  # the same array is handed out to every caller
+        self.memory.put(key, value)
+        if self.store is not None:
+            try:
+                self.store.put(key, value)
+            except sqlite3.Error as e:
+                print(f"Error writing to the {self.name} cache store: {str(e)}")
@@ -0,0 +1,58 @@
+import numpy as np
+from flask import Response, jsonify
+
+BINARY_MIMETYPE = "application/octet-stream"
+BINARY_DTYPES = ("float32", "float16", "int8")
+
+def embedding_response(embedding, request):
+    """
+    Build the response for a single embedding, negotiated on the Accept header of the request.
+    JSON stays the default. Clients accepting application/octet-stream receive the raw little-endian
+    vector instead, in the dtype given by the 'dtype' query parameter (float32, float16 or int8).
+
+    Args:
+        embedding: 1-dimensional NumPy array
+        request: Flask request object
+
+    Returns:
+        Flask response object with the embedding
+
+    Raises:
+        ValueError: If an unsupported dtype is requested
+    """
+    best_match = request.accept_mimetypes.best_match(["application/json", BINARY_MIMETYPE])
+    if best_match != BINARY_MIMETYPE:
+        return jsonify({"dimension": embedding.shape[0], "embedding": embedding.tolist()})
+
+    dtype = request.args.get("dtype", "float32").lower()
+    payload, headers = encode_embedding(embedding, dtype)
+    headers["X-Embedding-Dimension"] = str(embedding.shape[0])
+    headers["X-Embedding-Dtype"] = dtype
+    headers["Vary"] = "Accept"
+    return Response(payload, mimetype=BINARY_MIMETYPE, headers=headers)
+
+def encode_embedding(embedding, dtype):
+    """
+    Encode an embedding as raw little-endian bytes.
+    int8 uses symmetric quantisation; the value of element i is payload[i] * X-Embedding-Scale.
+
+    Args:
+        embedding: 1-dimensional NumPy array
+        dtype: One of BINARY_DTYPES
+
+    Returns:
+        Tuple (payload, headers) of the encoded bytes and the additional headers needed to decode them
+
+    Raises:
+        ValueError: If dtype is not supported
+    """
+    if dtype == "float32":
+        return embedding.astype("<f4").tobytes(), {}
+    if dtype == "float16":
+        return embedding.astype("<f2").tobytes(), {}
+    if dtype == "int8":
+        max_abs = float(np.max(np.abs(embedding))) if embedding.size else 0.0
+        scale = max_abs / 127.0 if max_abs > 0 else 1.0
+        quantized = np.clip(np.rint(embedding / scale), -127, 127).astype(np.int8)
+        return quantized.tobytes(), {"X-Embedding-Scale": repr(scale)}
+    raise ValueError(f"Unsupported dtype '{dtype}', expected one of {', '.join(BINARY_DTYPES)}")
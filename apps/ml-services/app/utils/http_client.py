@@ -0,0 +1,83 @@
+import random
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from ..config import Config
+from .metrics import metrics
+
+# Statuses that are worth retrying: rate limiting and transient server or gateway errors
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+class RetryPolicy:
+    """
+    Bounded retries with exponential backoff and full jitter:
+    attempt n waits a random time between 0 and min(max_backoff, backoff * 2^n).
+    """
+
+    def __init__(self, max_retries, backoff, max_backoff=10.0):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+    @classmethod
+    def from_config(cls):
+        return cls(Config.HTTP_MAX_RETRIES, Config.HTTP_RETRY_BACKOFF)
+
+    def delay(self, attempt):
+        """Seconds to wait before retry number `attempt` (starting at 0)"""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+def create_session(pool_size=None):
+    """
+    Create a requests session whose connection pool holds `pool_size` connections per host,
+    so that concurrent gunicorn threads reuse connections instead of opening throwaway ones.
+    Retries are done by send_with_retries, not by the adapter.
+    """
+    pool_size = pool_size or Config.HTTP_POOL_SIZE
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def default_timeout():
+    """(connect, read) timeout tuple for requests"""
+    return (Config.HTTP_CONNECT_TIMEOUT, Config.HTTP_READ_TIMEOUT)
+
+def send_with_retries(session, method, url, policy=None, before_retry=None, **kwargs):
+    """
+    Send a request, retrying connection errors, timeouts and retryable statuses.
+
+    Args:
+        session: requests.Session to send the request with
+        method: HTTP method
+        url: Request URL
+        policy: RetryPolicy, defaults to the configured one
+        before_retry: Optional callable invoked before every retry, e.g. to rewind a request body
+        **kwargs: Passed to session.request, the timeout defaults to the configured one
+
+    Returns:
+        requests.Response of the last attempt, which may still have a retryable status
+
+    Raises:
+        requests.RequestException: If the last attempt failed without a response
+    """
+    policy = policy or RetryPolicy.from_config()
+    kwargs.setdefault("timeout", default_timeout())
+
+    for attempt in range(policy.max_retries + 1):
+        last_attempt = attempt == policy.max_retries
+        try:
+            response = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if last_attempt:
+                raise
+        else:
+            if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                return response
+            response.close()
+
+        metrics.increment("http_retries")
+        time.sleep(policy.delay(attempt))
+        if before_retry is not None:
+            before_retry()
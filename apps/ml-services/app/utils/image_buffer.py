@@ -0,0 +1,162 @@
+import io
+import mmap
+import tempfile
+from ..config import Config
+
+class ImageBuffer:
+    """
+    Encoded image data buffered exactly once and exposed as a memoryview.
+    Small inputs live in memory, large inputs are spooled to a temporary file and memory-mapped.
+    Decoders read through open(), which serves slices of the view instead of copying the whole buffer.
+    """
+
+    def __init__(self, view, owner=None):
+        """
+        Args:
+            view: memoryview of the encoded image
+            owner: Object backing the view (file, mmap) that is kept alive as long as the buffer
+        """
+        self.view = view
+        self.format = None  # set by decoders once the image format is known
+        self._owner = owner
+
+    def __len__(self):
+        return self.view.nbytes
+
+    def open(self):
+        """
+        Returns:
+            Seekable binary file-like object reading from the buffer without copying it
+        """
+        return _MemoryViewReader(self.view)
+
+    @classmethod
+    def from_file(cls, file_obj):
+        """
+        Wrap a file-like object (e.g. the stream of a Werkzeug FileStorage) without copying it if possible
+
+        Args:
+            file_obj: BytesIO, (spooled) temporary file, real file or any other readable file-like object
+
+        Returns:
+            ImageBuffer with the complete content of the file
+        """
+        if isinstance(file_obj, io.BytesIO):
+            # getvalue() shares the underlying bytes where possible; getbuffer() would pin the BytesIO
+            # and make its close() (e.g. by Werkzeug at the end of the request) raise a BufferError
+            return cls(memoryview(file_obj.getvalue()))
+
+        if isinstance(file_obj, tempfile.SpooledTemporaryFile) and not file_obj._rolled:
+            # still in memory (at most Werkzeug's 500 KB), fileno() would force it to disk;
+            # once rolled over, the file on disk is memory-mapped below
+            file_obj.seek(0)
+            return cls(memoryview(file_obj.read()))
+
+        try:
+            fileno = file_obj.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            fileno = None
+
+        if fileno is not None:
+            file_obj.flush()
+            file_obj.seek(0, io.SEEK_END)
+            if file_obj.tell() > 0:
+                mapped = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+                return cls(memoryview(mapped), owner=(file_obj, mapped))
+
+        file_obj.seek(0)
+        return cls(memoryview(file_obj.read()), owner=file_obj)
+
+    @classmethod
+    def from_chunks(cls, chunks, content_length=None):
+        """
+        Buffer a stream of chunks (e.g. an HTTP response body) once.
+        With a known Content-Length up to IMAGE_BUFFER_SPOOL_SIZE the buffer is preallocated,
+        larger or unbounded inputs spill to a memory-mapped temporary file.
+
+        Args:
+            chunks: Iterable of bytes-like chunks
+            content_length: Announced size of the data in bytes, if known
+
+        Returns:
+            ImageBuffer with the complete data
+
+        Raises:
+            ValueError: If the data does not match the announced Content-Length
+        """
+        spool_size = Config.IMAGE_BUFFER_SPOOL_SIZE
+
+        if content_length is not None and content_length <= spool_size:
+            buffer = bytearray(content_length)
+            view = memoryview(buffer)
+            position = 0
+            for chunk in chunks:
+                end = position + len(chunk)
+                if end > content_length:
+                    raise ValueError(f"Received more than the announced {content_length} bytes")
+                view[position:end] = chunk
+                position = end
+            if position != content_length:
+                raise ValueError(f"Received {position} of the announced {content_length} bytes")
+            return cls(view, owner=buffer)
+
+        buffer = bytearray()
+        spill = None
+        if content_length is not None:
+            spill = tempfile.TemporaryFile()
+        for chunk in chunks:
+            if spill is None and len(buffer) + len(chunk) > spool_size:
+                spill = tempfile.TemporaryFile()
+                spill.write(buffer)
+                buffer = None
+            if spill is not None:
+                spill.write(chunk)
+            else:
+                buffer += chunk
+
+        if spill is not None:
+            return cls.from_file(spill)
+        return cls(memoryview(buffer), owner=buffer)
+
+class _MemoryViewReader(io.RawIOBase):
+    """Read-only, seekable file-like object over a memoryview"""
+
+    def __init__(self, view):
+        self._view = view
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            position = self._view.nbytes + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return position
+
+    def read(self, size=-1):
+        end = self._view.nbytes if size is None or size < 0 else min(self._view.nbytes, self._position + size)
+        data = self._view[self._position:end].tobytes()
+        self._position = max(self._position, end)
+        return data
+
+    def readinto(self, b):
+        end = min(self._view.nbytes, self._position + len(b))
+        count = max(0, end - self._position)
+        b[:count] = self._view[self._position:self._position + count]
+        self._position += count
+        return count
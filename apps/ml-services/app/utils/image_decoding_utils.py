@@ -0,0 +1,61 @@
+import numpy as np
+from PIL import Image
+
+class ClipPreprocessing:
+    """
+    Preprocessing parameters of a CLIP image processor: shortest edge resize, center crop and normalisation
+    """
+
+    def __init__(self, processor):
+        image_processor = getattr(processor, "image_processor", None) or processor.feature_extractor
+
+        size = image_processor.size
+        self.shortest_edge = size["shortest_edge"] if isinstance(size, dict) else size
+        crop_size = image_processor.crop_size
+        if isinstance(crop_size, dict):
+            self.crop_height, self.crop_width = crop_size["height"], crop_size["width"]
+        else:
+            self.crop_height = self.crop_width = crop_size
+
+        # Fold the rescaling to [0, 1] into the normalisation: (x / 255 - mean) / std = x * scale + offset
+        mean = np.asarray(image_processor.image_mean, dtype=np.float32)
+        std = np.asarray(image_processor.image_std, dtype=np.float32)
+        self.scale = 1.0 / (255.0 * std)
+        self.offset = -mean / std
+
+def decode_image_for_clip(image_file, preprocessing):
+    """
+    Decode an image directly into CLIP pixel values, skipping the PIL/processor round trip.
+    JPEGs are decoded in draft mode, letting libjpeg scale down by 1/2, 1/4 or 1/8 during the DCT
+    as long as the shortest edge stays at least as large as the resize target. Decoding a 12 MP
+    photo this way touches a fraction of the pixels of a full decode.
+
+    Args:
+        image_file: Binary file-like object containing the encoded image
+        preprocessing: ClipPreprocessing of the model
+
+    Returns:
+        float32 NumPy array of shape (3, crop_height, crop_width)
+    """
+    image = Image.open(image_file)
+    if image.format in ("JPEG", "MPO"):  # camera JPEGs with a preview image open as MPO
+        image.draft("RGB", (preprocessing.shortest_edge, preprocessing.shortest_edge))
+    image = image.convert("RGB")
+
+    # Resize the shortest edge to the target size, like the CLIP image processor does
+    width, height = image.size
+    short, long = (width, height) if width <= height else (height, width)
+    new_short = preprocessing.shortest_edge
+    new_long = int(new_short * long / short)
+    new_size = (new_short, new_long) if width <= height else (new_long, new_short)
+    image = image.resize(new_size, Image.BICUBIC)
+
+    # Center crop
+    left = (new_size[0] - preprocessing.crop_width) // 2
+    top = (new_size[1] - preprocessing.crop_height) // 2
+    image = image.crop((left, top, left + preprocessing.crop_width, top + preprocessing.crop_height))
+
+    pixels = np.asarray(image, dtype=np.float32)
+    pixels *= preprocessing.scale
+    pixels += preprocessing.offset
+    return np.ascontiguousarray(pixels.transpose(2, 0, 1))
@@ -0,0 +1,219 @@
+import io
+import struct
+import numpy as np
+from PIL import Image
+from ..config import Config
+
+FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg"),
+    "webp": ("WEBP", "image/webp"),
+}
+SUBSAMPLINGS = ("4:4:4", "4:2:2", "4:2:0")
+
+# EXIF tags of the first IFD kept in the output. Everything else is dropped: the IFD1 thumbnail
+# shows the unblurred original, and GPS, camera and owner tags identify where and by whom it was taken.
+KEPT_EXIF_TAGS = (
+    0x0112,  # Orientation
+    0x011A,  # XResolution
+    0x011B,  # YResolution
+    0x0128,  # ResolutionUnit
+)
+
+class EncodingOptions:
+    """
+    Output encoding of processed images. Defaults come from the deployment configuration
+    and can be overridden per request.
+    """
+
+    def __init__(self, format="jpeg", quality=75, subsampling="4:2:0", optimize=False,
+                 progressive=False, keep_exif=True, fast=False):
+        if format not in FORMATS:
+            raise ValueError(f"Unsupported output format '{format}', use one of {', '.join(FORMATS)}")
+        if not 1 <= quality <= 100:
+            raise ValueError(f"Quality must be between 1 and 100, got {quality}")
+        if subsampling not in SUBSAMPLINGS:
+            raise ValueError(f"Unsupported subsampling '{subsampling}', use one of {', '.join(SUBSAMPLINGS)}")
+
+        self.format = format
+        self.quality = quality
+        self.subsampling = subsampling
+        self.optimize = optimize
+        self.progressive = progressive
+        self.keep_exif = keep_exif
+        self.fast = fast
+
+    @classmethod
+    def from_config(cls):
+        return cls(
+            format=Config.OUTPUT_FORMAT,
+            quality=Config.OUTPUT_QUALITY,
+            subsampling=Config.OUTPUT_JPEG_SUBSAMPLING,
+            optimize=Config.OUTPUT_JPEG_OPTIMIZE,
+            progressive=Config.OUTPUT_JPEG_PROGRESSIVE,
+            keep_exif=Config.OUTPUT_KEEP_EXIF,
+            fast=Config.OUTPUT_FAST_ENCODE,
+        )
+
+    @property
+    def mimetype(self):
+        return FORMATS[self.format][1]
+
+    def allows_pass_through(self, image_format, info):
+        """
+        Whether an image can be passed on without re-encoding it: only with the configured encoding,
+        and only if the image carries no metadata, or only the KEPT_EXIF_TAGS while EXIF is kept
+
+        Args:
+            image_format: PIL format of the image, MPO (camera JPEGs with a preview image) counts as JPEG
+            info: PIL info dict of the image
+        """
+        if image_format == "MPO":
+            image_format = "JPEG"
+        if FORMATS[self.format][0] != image_format:
+            return False
+        if vars(self) != vars(EncodingOptions.from_config()):
+            return False  # -> quality or progressive were overridden by the request
+        if any(key in info for key in ("xmp", "comment", "photoshop")):
+            return False
+        if not info.get("exif"):
+            return True
+        return self.keep_exif and _has_only_kept_exif(info["exif"])
+
+def get_encoding_options_from_request(request):
+    """
+    Helper function to read the output encoding from the request.
+    The form fields 'format', 'quality' and 'progressive' override the configured defaults.
+
+    Args:
+        request: Flask request object
+
+    Returns:
+        EncodingOptions
+
+    Raises:
+        ValueError: If a field has an invalid value
+    """
+    defaults = EncodingOptions.from_config()
+    form = request.form
+
+    output_format = form.get('format', '').strip().lower() or defaults.format
+    if output_format == 'jpg':
+        output_format = 'jpeg'
+
+    quality = form.get('quality', '').strip()
+    if not quality:
+        quality = defaults.quality
+    elif quality.isdigit():
+        quality = int(quality)
+    else:
+        raise ValueError(f"Quality must be an integer, got '{quality}'")
+
+    progressive = form.get('progressive', '').strip().lower()
+    progressive = progressive == 'true' if progressive else defaults.progressive
+
+    return EncodingOptions(output_format, quality, defaults.subsampling, defaults.optimize,
+                           progressive, defaults.keep_exif, defaults.fast)
+
+def encode_image(image, options):
+    """
+    Encode a PIL image with the given options
+
+    Args:
+        image: PIL Image object, the KEPT_EXIF_TAGS of its EXIF data (info['exif']) are passed through if enabled
+        options: EncodingOptions
+
+    Returns:
+        io.BytesIO positioned at the start of the encoded image
+    """
+    exif = sanitize_exif(image.info.get("exif")) if options.keep_exif else None
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+
+    # simplejpeg only writes baseline JPEGs
+    if options.format == "jpeg" and options.fast and not options.progressive and image.mode == "RGB":
+        encoded = _encode_jpeg_fast(image, options, exif)
+        if encoded is not None:
+            return encoded
+
+    params = {"quality": options.quality}
+    if options.format == "jpeg":
+        params.update(subsampling=options.subsampling, optimize=options.optimize, progressive=options.progressive)
+    if exif:
+        params["exif"] = exif
+
+    output = io.BytesIO()
+    image.save(output, format=FORMATS[options.format][0], **params)
+    output.seek(0)
+    return output
+
+def sanitize_exif(exif):
+    """
+    Reduce raw EXIF data to the KEPT_EXIF_TAGS
+
+    Args:
+        exif: Raw EXIF data as in PIL's info['exif'], or None
+
+    Returns:
+        Raw EXIF data with only the kept tags, or None if none of them is present
+    """
+    if not exif:
+        return None
+    source = Image.Exif()
+    try:
+        source.load(exif)
+    except Exception:
+        return None  # -> unreadable EXIF data is dropped
+    kept = Image.Exif()
+    for tag in KEPT_EXIF_TAGS:
+        if tag in source:
+            kept[tag] = source[tag]
+    return kept.tobytes() if len(kept) else None
+
+def _has_only_kept_exif(exif):
+    """Whether raw EXIF data has no tags beyond the KEPT_EXIF_TAGS and no IFD1 (thumbnail)"""
+    if not exif:
+        return True
+    source = Image.Exif()
+    try:
+        source.load(exif)
+    except Exception:
+        return False
+    if not set(source) <= set(KEPT_EXIF_TAGS):
+        return False
+
+    # the offset of the next IFD follows the entries of the first one, it is 0 without an IFD1
+    tiff = exif[6:] if exif.startswith(b"Exif\x00\x00") else exif
+    order = "<" if tiff[:2] == b"II" else ">"
+    try:
+        first_ifd = struct.unpack_from(order + "L", tiff, 4)[0]
+        entries = struct.unpack_from(order + "H", tiff, first_ifd)[0]
+        next_ifd = struct.unpack_from(order + "L", tiff, first_ifd + 2 + 12 * entries)[0]
+    except struct.error:
+        return False
+    return next_ifd == 0
+
+def _encode_jpeg_fast(image, options, exif):
+    """
+    Encode with simplejpeg (libjpeg-turbo with SIMD and the fast integer DCT).
+    Returns None if simplejpeg is not installed, so that the caller falls back to Pillow.
+    """
+    try:
+        import simplejpeg
+    except ImportError:
+        return None
+
+    data = simplejpeg.encode_jpeg(
+        np.asarray(image),
+        quality=options.quality,
+        colorspace="RGB",
+        colorsubsampling=options.subsampling.replace(":", ""),
+        fastdct=True,
+    )
+    if exif and len(exif) <= 0xFFFF - 2:
+        # simplejpeg cannot write metadata: insert the EXIF APP1 segment after the SOI marker
+        # and the JFIF APP0 segment, which must come first
+        position = 2
+        if data[2:4] == b"\xff\xe0":
+            position = 4 + struct.unpack(">H", data[4:6])[0]
+        data = data[:position] + b"\xff\xe1" + struct.pack(">H", len(exif) + 2) + exif + data[position:]
+    return io.BytesIO(data)
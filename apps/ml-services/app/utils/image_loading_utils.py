@@ -1,6 +1,7 @@
-import io
 from flask import send_file, jsonify
 from app.services.image_loading_service import ImageDownloadError, ImageUploadError
+from app.utils.image_buffer import ImageBuffer
+from app.utils.image_encoding_utils import encode_image
 
 def get_image_from_request(request, image_loading_service):
     """
@@ -12,7 +13,7 @@ def get_image_from_request(request, image_loading_service):
         image_loading_service: Service used to download images from URLs
         
     Returns:
-        file-like object containing the image data or None if invalid input parameters
+        ImageBuffer containing the image data or None if invalid input parameters
         
     Raises:
         ImageDownloadError: If the image fails to download from the provided URL
@@ -25,12 +26,70 @@ def get_image_from_request(request, image_loading_service):
         return None
     
     if has_file:
-        return request.files['image']
+        # Wrap the upload stream (spooled to a temporary file by Werkzeug for large uploads) without copying it
+        return ImageBuffer.from_file(request.files['image'].stream)
     else:
         # Download from URL - let any ImageDownloadError propagate to the caller
         url = request.form['url']
         return image_loading_service.download_image(url)
 
+def get_batch_images_from_request(request, image_loading_service, max_items):
+    """
+    Helper function to extract many images from a batch request.
+    Accepts either multipart file uploads under the 'images' field (keyed by filename)
+    or a JSON body of the form {"urls": {"<id>": "<url>", ...}}.
+    
+    Args:
+        request: Flask request object
+        image_loading_service: Service used to download images from URLs
+        max_items: Maximum number of images accepted in one request
+        
+    Returns:
+        Tuple (images, errors) or None if invalid input parameters: images maps input ids
+        to ImageBuffers (for URLs, an iterator of (id, ImageBuffer) pairs that prefetches the
+        downloads), errors maps the ids of failed downloads to the ImageDownloadError once
+        the images have been consumed
+        
+    Raises:
+        ValueError: If the request contains more than max_items images, or two files with the same name
+    """
+    images = {}
+    errors = {}
+    
+    if request.is_json:
+        data = request.get_json(silent=True)
+        urls = data.get('urls') if isinstance(data, dict) else None
+        if not isinstance(urls, dict) or not urls:
+            return None
+        if len(urls) > max_items:
+            raise ValueError(f"A batch may contain at most {max_items} images")
+        
+        if any(not isinstance(url, str) or url.strip() == '' for url in urls.values()):
+            return None
+        # Downloads continue in the background while the caller processes the first images
+        images = _successful_downloads(image_loading_service.prefetch_images(urls), errors)
+    else:
+        files = [f for f in request.files.getlist('images') if f.filename != '']
+        if not files:
+            return None
+        if len(files) > max_items:
+            raise ValueError(f"A batch may contain at most {max_items} images")
+        
+        for file in files:
+            if file.filename in images:
+                raise ValueError(f"Duplicate image id '{file.filename}', file names must be unique")
+            images[file.filename] = ImageBuffer.from_file(file.stream)
+    
+    return images, errors
+
+def _successful_downloads(downloads, errors):
+    """Yield the (id, ImageBuffer) pairs of successful downloads, collecting the failed ones in errors"""
+    for image_id, result in downloads:
+        if isinstance(result, ImageDownloadError):
+            errors[image_id] = result
+        else:
+            yield image_id, result
+
 def get_upload_url_from_request(request):
     """
     Helper function to extract the upload URL from the request if present.
@@ -44,29 +103,29 @@ def get_upload_url_from_request(request):
     upload_url = request.form.get('upload_url', '').strip()
     return upload_url if upload_url else None
 
-def serve_image(image):
+def serve_image(image, encoding_options):
     """
     Convert PIL Image to file-like object and serve it
     
     Args:
-        image: PIL Image object
+        image: PIL Image object, or the ImageBuffer of an unchanged input image
+        encoding_options: EncodingOptions of the response image
         
     Returns:
         Flask response object with the image data
     """
-    img_io = io.BytesIO()
-    image.save(img_io, format="JPEG")
-    img_io.seek(0)
-    return send_file(img_io, mimetype="image/jpeg")
+    img_io, mimetype = _encode(image, encoding_options)
+    return send_file(img_io, mimetype=mimetype)
 
-def upload_image_and_respond(image, upload_url, image_loading_service):
+def upload_image_and_respond(image, upload_url, image_loading_service, encoding_options):
     """
     Upload an image to the specified URL and return a success response.
     
     Args:
-        image: PIL Image object
+        image: PIL Image object, or the ImageBuffer of an unchanged input image
         upload_url: URL to upload the image to
         image_loading_service: Service used to upload the image
+        encoding_options: EncodingOptions of the uploaded image
         
     Returns:
         Flask response object with success message
@@ -75,9 +134,7 @@ def upload_image_and_respond(image, upload_url, image_loading_service):
         ImageUploadError: If the image fails to upload
     """
     # Convert PIL image to file-like object
-    img_io = io.BytesIO()
-    image.save(img_io, format="JPEG")
-    img_io.seek(0)
+    img_io, _ = _encode(image, encoding_options)
     
     # Upload the image
     image_loading_service.upload_image(upload_url, img_io)
@@ -87,4 +144,16 @@ def upload_image_and_respond(image, upload_url, image_loading_service):
         "success": True,
         "message": "Image processed and uploaded successfully",
         "upload_url": upload_url
-    })
\ No newline at end of file
+    })
+
+def _encode(image, encoding_options):
+    """
+    Encode the output image. The ImageBuffer of an unchanged input image is passed on as is,
+    the services return it only if the encoding options allow it (see EncodingOptions.allows_pass_through).
+    
+    Returns:
+        Tuple (file-like object, mimetype)
+    """
+    if isinstance(image, ImageBuffer):
+        return image.open(), encoding_options.mimetype
+    return encode_image(image, encoding_options), encoding_options.mimetype
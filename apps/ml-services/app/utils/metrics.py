@@ -0,0 +1,71 @@
+import threading
+from collections import deque
+
+class Metrics:
+    """
+    Minimal in-process metrics registry.
+    Supports counters, gauges and summaries (count/sum/max plus percentiles over recent samples).
+    Metrics are per process, so every gunicorn worker reports its own values.
+    """
+
+    def __init__(self, sample_size=1024):
+        self._lock = threading.Lock()
+        self._sample_size = sample_size
+        self._counters = {}
+        self._gauges = {}
+        self._summaries = {}
+
+    def increment(self, name, value=1):
+        """Increase the counter `name` by `value` and return its new value"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+            return self._counters[name]
+
+    def set_gauge(self, name, value):
+        """Set the gauge `name` to `value`"""
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name, value):
+        """Record a single observation (e.g. a latency or a batch size) for the summary `name`"""
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = {"count": 0, "sum": 0.0, "max": value, "samples": deque(maxlen=self._sample_size)}
+                self._summaries[name] = summary
+            summary["count"] += 1
+            summary["sum"] += value
+            summary["max"] = max(summary["max"], value)
+            summary["samples"].append(value)
+
+    def snapshot(self):
+        """
+        Get the current value of all metrics
+
+        Returns:
+            dict with 'counters', 'gauges' and 'summaries' suitable for JSON serialisation
+        """
+        with self._lock:
+            summaries = {}
+            for name, summary in self._summaries.items():
+                samples = sorted(summary["samples"])
+                summaries[name] = {
+                    "count": summary["count"],
+                    "mean": summary["sum"] / summary["count"],
+                    "max": summary["max"],
+                    "p50": self._percentile(samples, 0.50),
+                    "p95": self._percentile(samples, 0.95),
+                    "p99": self._percentile(samples, 0.99),
+                }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "summaries": summaries,
+            }
+
+    @staticmethod
+    def _percentile(sorted_samples, q):
+        index = min(len(sorted_samples) - 1, int(q * len(sorted_samples)))
+        return sorted_samples[index]
+
+metrics = Metrics()
@@ -0,0 +1,123 @@
+import cv2
+import numpy as np
+
+# Regions are merged, and regions sharing a kernel blurred in one pass, only if the
+# bounding box is at most this much larger than the area actually covered. Blurring
+# cost grows with the area, so merging e.g. two faces in opposite corners would not pay off.
+MAX_AREA_GROWTH = 1.5
+
+def kernel_size(width, height):
+    """Adaptive blur kernel of a region: 15% of its smaller side, odd, between 11 and 99"""
+    size = min(99, max(11, int(min(width, height) * 0.15)))
+    return size if size % 2 == 1 else size + 1
+
+def _area(box):
+    return (box[2] - box[0]) * (box[3] - box[1])
+
+def _bounding_box(boxes):
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+def merge_regions(regions, width, height):
+    """
+    Clip regions to the image and merge overlapping ones into their bounding box,
+    so that the overlap is not blurred several times
+
+    Args:
+        regions: List of tuples (x1, y1, x2, y2)
+        width: Image width
+        height: Image height
+
+    Returns:
+        List of (x1, y1, x2, y2, kernel size), a merged region keeps the largest kernel of its parts
+    """
+    boxes = []
+    for x1, y1, x2, y2 in regions:
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(width, x2), min(height, y2)
+        if x2 > x1 and y2 > y1:
+            boxes.append((x1, y1, x2, y2, kernel_size(x2 - x1, y2 - y1)))
+
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in sorted(boxes):
+            for i, other in enumerate(result):
+                overlap_w = min(box[2], other[2]) - max(box[0], other[0])
+                overlap_h = min(box[3], other[3]) - max(box[1], other[1])
+                if overlap_w <= 0 or overlap_h <= 0:
+                    continue
+                union = _bounding_box([box, other])
+                covered = _area(box) + _area(other) - overlap_w * overlap_h
+                if _area(union) <= MAX_AREA_GROWTH * covered:
+                    result[i] = union + (max(box[4], other[4]),)
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+
+    return boxes
+
+def blur_regions(image_np, regions, sigma=30, feather=0):
+    """
+    Gaussian blur regions of an image in place. Overlapping regions are merged and the
+    regions are grouped by kernel size; nearby regions of a group are blurred in a single pass
+    over their bounding area and composited back through a mask of the regions.
+
+    Args:
+        image_np: NumPy array of the image, modified in place
+        regions: List of tuples (x1, y1, x2, y2)
+        sigma: Standard deviation of the Gaussian blur
+        feather: Width in pixels of a soft transition around the regions, 0 for hard edges.
+            The regions themselves are always blurred completely.
+
+    Returns:
+        image_np
+    """
+    height, width = image_np.shape[:2]
+    groups = {}
+    for x1, y1, x2, y2, ksize in merge_regions(regions, width, height):
+        groups.setdefault(ksize, []).append((x1, y1, x2, y2))
+
+    for ksize, boxes in groups.items():
+        # Hard edges keep the previous behaviour of blurring each region on its own pixels,
+        # feathering needs the surroundings of the regions
+        margin = feather
+        areas = [
+            (max(0, x1 - margin), max(0, y1 - margin), min(width, x2 + margin), min(height, y2 + margin))
+            for x1, y1, x2, y2 in boxes
+        ]
+        bounding_area = _bounding_box(areas)
+        if len(boxes) > 1 and _area(bounding_area) <= MAX_AREA_GROWTH * sum(map(_area, areas)):
+            _blur_area(image_np, bounding_area, boxes, ksize, sigma, feather)
+        else:
+            for box, area in zip(boxes, areas):
+                _blur_area(image_np, area, [box], ksize, sigma, feather)
+
+    return image_np
+
+def _blur_area(image_np, area, boxes, ksize, sigma, feather):
+    """Blur an area of the image once and copy the blurred pixels of the boxes within it back"""
+    ax1, ay1, ax2, ay2 = area
+    view = image_np[ay1:ay2, ax1:ax2]
+    blurred = cv2.GaussianBlur(view, (ksize, ksize), sigma)
+
+    if feather <= 0 and len(boxes) == 1:
+        view[...] = blurred  # -> the area is the box
+        return
+
+    mask = np.zeros(view.shape[:2], dtype=np.uint8)
+    for x1, y1, x2, y2 in boxes:
+        mask[y1 - ay1:y2 - ay1, x1 - ax1:x2 - ax1] = 1
+
+    if feather <= 0:
+        where = mask.astype(bool)
+        np.copyto(view, blurred, where=where[..., None] if view.ndim == 3 else where)
+        return
+
+    # Fade out around the boxes, but keep the boxes themselves fully blurred
+    soft = cv2.dilate(mask, np.ones((2 * feather + 1, 2 * feather + 1), np.uint8)).astype(np.float32)
+    soft = cv2.GaussianBlur(soft, (0, 0), feather / 2)
+    alpha = np.maximum(soft, mask)
+    view[...] = cv2.blendLinear(blurred, view, alpha, 1.0 - alpha)
@@ -27,20 +27,113 @@ def install_pgk(pkg):
 def fetch_and_cache_embedding_model():
     """
     Downloads and caches the CLIP model and processor from Hugging Face Hub.
-    This ensures that the models are available locally and can be loaded quickly
-    the next time the service is started.
+    Additionally writes a safetensors copy to EMBEDDING_MODEL_PATH, which the service
+    memory-maps at startup instead of deserializing the pickled weights.
     """
     print("Fetching and caching the CLIP model and processor...")
 
     from transformers import CLIPProcessor, CLIPModel
 
     embedding_model = os.getenv("EMBEDDING_MODEL_NAME", "openai/clip-vit-base-patch16")
+    model_path = os.getenv("EMBEDDING_MODEL_PATH", "models/embedding")
 
     # Fetch and cache the model and processor
-    CLIPModel.from_pretrained(embedding_model)
-    CLIPProcessor.from_pretrained(embedding_model)
+    model = CLIPModel.from_pretrained(embedding_model)
+    processor = CLIPProcessor.from_pretrained(embedding_model)
+
+    # Export the model as safetensors for fast, memory-mapped loading
+    model.save_pretrained(model_path, safe_serialization=True)
+    processor.save_pretrained(model_path)
+
+    print(f"CLIP model and processor have been cached successfully and exported to {model_path}.")
+
+    backend = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+    quantize = os.getenv("EMBEDDING_QUANTIZE", "false").lower() == "true"
+    if backend in ("torchscript", "onnx"):
+        export_embedding_model(model, processor, model_path, backend)
+        if quantize:
+            quantize_embedding_model(model, processor, model_path, backend)
+
+def export_embedding_model(model, processor, model_path, backend, suffix=""):
+    """
+    Exports the text and image towers of the CLIP model for the TorchScript or ONNX
+    inference backend of the embedding service. The batch dimension stays dynamic,
+    texts are always padded to the maximum length of the tokenizer.
+    """
+    print(f"Exporting the CLIP text and image towers for the {backend} backend...")
+
+    import torch
+
+    class TextTower(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+    class ImageTower(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, pixel_values):
+            return self.model.get_image_features(pixel_values=pixel_values)
+
+    model.eval()
+    text_inputs = processor(
+        text=["a photo of a construction site", "an excavator"], padding="max_length", return_tensors="pt"
+    )
+    text_example = (text_inputs["input_ids"], text_inputs["attention_mask"])
+    image_size = model.config.vision_config.image_size
+    image_example = (torch.randn(2, 3, image_size, image_size),)
+
+    with torch.no_grad():
+        if backend == "torchscript":
+            text_model = torch.jit.freeze(torch.jit.trace(TextTower(model).eval(), text_example))
+            image_model = torch.jit.freeze(torch.jit.trace(ImageTower(model).eval(), image_example))
+            torch.jit.save(text_model, os.path.join(model_path, f"text_model{suffix}.pt"))
+            torch.jit.save(image_model, os.path.join(model_path, f"image_model{suffix}.pt"))
+        else:
+            torch.onnx.export(
+                TextTower(model), text_example, os.path.join(model_path, f"text_model{suffix}.onnx"),
+                input_names=["input_ids", "attention_mask"], output_names=["embeddings"],
+                dynamic_axes={"input_ids": {0: "batch"}, "attention_mask": {0: "batch"}, "embeddings": {0: "batch"}},
+                opset_version=14, do_constant_folding=True
+            )
+            torch.onnx.export(
+                ImageTower(model), image_example, os.path.join(model_path, f"image_model{suffix}.onnx"),
+                input_names=["pixel_values"], output_names=["embeddings"],
+                dynamic_axes={"pixel_values": {0: "batch"}, "embeddings": {0: "batch"}},
+                opset_version=14, do_constant_folding=True
+            )
+
+    print(f"CLIP towers have been exported to {model_path}.")
+
+def quantize_embedding_model(model, processor, model_path, backend):
+    """
+    Writes dynamically int8 quantised variants (*.int8.pt / *.int8.onnx) of the exported towers,
+    with int8 weights and activations quantised on the fly for all Linear layers.
+    The eager torch backend quantises at startup and needs no build step.
+    """
+    print(f"Quantising the CLIP text and image towers for the {backend} backend...")
+
+    if backend == "torchscript":
+        import torch
+
+        quantized_model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        export_embedding_model(quantized_model, processor, model_path, backend, suffix=".int8")
+    else:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        for tower in ("text", "image"):
+            quantize_dynamic(
+                os.path.join(model_path, f"{tower}_model.onnx"),
+                os.path.join(model_path, f"{tower}_model.int8.onnx"),
+                weight_type=QuantType.QInt8
+            )
 
-    print("CLIP model and processor have been cached successfully.")
+    print(f"Quantised CLIP towers have been written to {model_path}.")
 
 def fetch_and_cache_recognition_models():
     """
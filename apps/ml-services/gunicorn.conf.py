@@ -0,0 +1,16 @@
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers = int(os.getenv("WORKERS", 1))
+threads = int(os.getenv("THREADS", 1))
+
+# Preload mode: create the app (and load its models) once in the master process and fork
+# the workers from it, so the model weights are shared copy-on-write between all workers
+preload_app = os.getenv("PRELOAD", "false").lower() == "true"
+
+def when_ready(server):
+    # Move everything allocated so far into the permanent generation, so that garbage
+    # collections in the workers do not write to (and thereby copy) the shared pages
+    if preload_app:
+        gc.freeze()
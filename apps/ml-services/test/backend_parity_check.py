@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Inference Backend Parity Check
+
+Compares the text and image embeddings of the exported inference backends against the eager
+PyTorch model and fails if any cosine similarity falls below the threshold.
+The exported towers must have been written by fetch_deps.py beforehand, e.g.
+    EMBEDDING_BACKEND=onnx python fetch_deps.py
+
+Usage (from apps/ml-services):
+    python test/backend_parity_check.py --backends torchscript onnx
+    python test/backend_parity_check.py --backends onnx --images test/images --threshold 0.999
+"""
+
+import argparse
+import glob
+import os
+import sys
+import numpy as np
+from PIL import Image
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from transformers import CLIPProcessor
+from app.config import Config
+from app.services.inference_backends import create_backend, TorchBackend
+
+TEXTS = ["bagger", "kran", "betonmischer", "a construction site with a crane", "workers on a scaffold"]
+
+def embed(backend, processor, texts, images):
+    text_inputs = processor(text=texts, return_tensors="pt", padding=backend.text_padding)
+    image_inputs = processor(images=images, return_tensors="pt")
+    return backend.text_features(text_inputs).numpy(), backend.image_features(image_inputs).numpy()
+
+def cosine_similarities(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check exported backends against the eager model")
+    parser.add_argument("--backends", nargs="+", default=["torchscript", "onnx"], help="Backends to check")
+    parser.add_argument("--images", default=os.path.join(SERVICE_DIR, "test", "images"), help="Directory of sample images")
+    parser.add_argument("--threshold", type=float, default=0.999, help="Minimum cosine similarity")
+    args = parser.parse_args()
+
+    source = Config.EMBEDDING_MODEL_NAME
+    if os.path.isfile(os.path.join(Config.EMBEDDING_MODEL_PATH, "model.safetensors")):
+        source = Config.EMBEDDING_MODEL_PATH
+
+    processor = CLIPProcessor.from_pretrained(source)
+    images = [Image.open(path).convert("RGB") for path in sorted(glob.glob(os.path.join(args.images, "*.jpg")))]
+    reference_text, reference_image = embed(TorchBackend(source), processor, TEXTS, images)
+
+    failed = False
+    for name in args.backends:
+        backend = create_backend(name, source, Config.EMBEDDING_MODEL_PATH, Config.EMBEDDING_INTRA_OP_THREADS)
+        text, image = embed(backend, processor, TEXTS, images)
+
+        for kind, similarities in (("text", cosine_similarities(reference_text, text)),
+                                   ("image", cosine_similarities(reference_image, image))):
+            ok = similarities.min() >= args.threshold
+            failed = failed or not ok
+            print(f"{name:>12} {kind:>5}: min cosine similarity {similarities.min():.6f} "
+                  f"(mean {similarities.mean():.6f}) {'OK' if ok else 'FAILED'}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
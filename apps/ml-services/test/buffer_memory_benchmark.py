@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Image Buffer Memory Benchmark
+
+Compares the peak Python heap allocations (tracemalloc) of the previous image input path
+(FileStorage.read() / 8 KB chunks copied into a BytesIO, then .read() into bytes and wrapped
+in another BytesIO) with the ImageBuffer path, for an uploaded and a downloaded ~20 MB image.
+Each path buffers the input and opens it with PIL, which is what happens before decoding.
+Uploads are posted as multipart form data through a Flask test client, so the view gets the
+SpooledTemporaryFile that Werkzeug actually produces, and only the view is measured.
+Memory-mapped pages belong to the page cache and do not show up in the heap peak.
+
+Usage (from apps/ml-services):
+    python test/buffer_memory_benchmark.py
+    python test/buffer_memory_benchmark.py --size-mb 50
+"""
+
+import argparse
+import io
+import os
+import sys
+import tracemalloc
+import numpy as np
+from flask import Flask, jsonify, request
+from PIL import Image
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from app.utils.image_buffer import ImageBuffer
+
+CHUNK_SIZE = 64 * 1024
+
+def make_png(size_mb):
+    """Encode random noise as PNG, which barely compresses, to get an image of roughly size_mb"""
+    side = int((size_mb * 1024 * 1024 / 3) ** 0.5)
+    pixels = np.random.default_rng(0).integers(0, 255, (side, side, 3), dtype=np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format="PNG", compress_level=1)
+    return output.getvalue()
+
+def iter_chunks(data):
+    for i in range(0, len(data), CHUNK_SIZE):
+        yield data[i:i + CHUNK_SIZE]
+
+def upload_previous(file):
+    data = file.read()  # BlurringService._get_image / EmbeddingService.embed_image
+    return Image.open(io.BytesIO(data)).size
+
+def upload_buffered(file):
+    return Image.open(ImageBuffer.from_file(file.stream).open()).size
+
+def create_upload_app():
+    """Flask app measuring the input paths on the uploaded file, as the service views receive it"""
+    app = Flask(__name__)
+    paths = {"previous": upload_previous, "buffered": upload_buffered}
+
+    @app.post("/<path>")
+    def upload(path):
+        return jsonify(peak=measure(paths[path], request.files["image"]))
+
+    return app
+
+def measure_upload(client, path, data):
+    response = client.post(f"/{path}", data={"image": (io.BytesIO(data), "image.png")},
+                           content_type="multipart/form-data")
+    return response.get_json()["peak"]
+
+def download_previous(data):
+    file_obj = io.BytesIO()
+    for chunk in iter_chunks(data):
+        file_obj.write(chunk)
+    file_obj.seek(0)
+    return Image.open(io.BytesIO(file_obj.read())).size
+
+def download_buffered(data):
+    return Image.open(ImageBuffer.from_chunks(iter_chunks(data), len(data)).open()).size
+
+def measure(function, *args):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the heap peak of the previous and the ImageBuffer input path")
+    parser.add_argument("--size-mb", type=float, default=20, help="Approximate size of the test image")
+    args = parser.parse_args()
+
+    data = make_png(args.size_mb)
+    print(f"Input: {len(data) / (1024 * 1024):.1f} MB PNG\n")
+
+    client = create_upload_app().test_client()
+    rows = [
+        ("upload", measure_upload(client, "previous", data), measure_upload(client, "buffered", data)),
+        ("download", measure(download_previous, data), measure(download_buffered, data)),
+    ]
+
+    print(f"{'input':<10} {'previous':>12} {'buffered':>12}")
+    for name, previous, buffered in rows:
+        print(f"{name:<10} {previous:>9.1f} MB {buffered:>9.1f} MB")
+
+if __name__ == "__main__":
+    main()
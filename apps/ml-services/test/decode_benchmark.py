@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Image Decode Benchmark
+
+Compares the per-image latency and peak memory of the default image path (full decode,
+CLIPProcessor) with the fast decode path (JPEG draft mode decode, NumPy preprocessing)
+used with EMBEDDING_FAST_DECODE=true. Each path runs in its own process so that peak RSS
+can be compared. Pass --synthetic to add a 12 MP camera-sized JPEG to the sample set.
+
+Usage (from apps/ml-services):
+    python test/decode_benchmark.py --images test/images
+    python test/decode_benchmark.py --images /data/samples --synthetic --repeat 10
+"""
+
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+def run_mode(mode, paths, repeat):
+    """Run a single decode path over all images and print the results as JSON"""
+    import io
+    import numpy as np
+    from PIL import Image
+    from transformers import CLIPProcessor
+    from app.config import Config
+    from app.utils.image_decoding_utils import ClipPreprocessing, decode_image_for_clip
+
+    processor = CLIPProcessor.from_pretrained(Config.EMBEDDING_MODEL_NAME)
+    preprocessing = ClipPreprocessing(processor)
+    samples = [open(path, "rb").read() for path in paths]
+
+    def current(data):
+        image = Image.open(io.BytesIO(data)).convert("RGB")
+        return processor(images=image, return_tensors="np")["pixel_values"][0]
+
+    def fast(data):
+        return decode_image_for_clip(io.BytesIO(data), preprocessing)
+
+    decode = current if mode == "current" else fast
+    decode(samples[0])  # warm up
+    baseline_rss = peak_rss_mb()
+
+    latencies = {}
+    for path, data in zip(paths, samples):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            pixels = decode(data)
+        latencies[os.path.basename(path)] = (time.perf_counter() - start) * 1000.0 / repeat
+
+    print(json.dumps({
+        "latencies": latencies,
+        "peak_rss_increase_mb": peak_rss_mb() - baseline_rss,
+        "shape": list(np.asarray(pixels).shape),
+    }))
+
+def write_synthetic_jpeg(directory):
+    """Write a noisy 4000x3000 (12 MP) JPEG, similar in size to a camera photo"""
+    import numpy as np
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (300, 400, 3), dtype=np.uint8)
+    image = Image.fromarray(base).resize((4000, 3000), Image.BILINEAR)
+    path = os.path.join(directory, "synthetic_12mp.jpg")
+    image.save(path, format="JPEG", quality=90)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the default and the fast image decode path")
+    parser.add_argument("--images", default=os.path.join(SERVICE_DIR, "test", "images"), help="Directory of sample images")
+    parser.add_argument("--synthetic", action="store_true", help="Add a synthetic 12 MP JPEG")
+    parser.add_argument("--repeat", type=int, default=5, help="Decodes per image")
+    parser.add_argument("--mode", choices=["current", "fast"], help=argparse.SUPPRESS)
+    parser.add_argument("--paths", nargs="*", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.paths, args.repeat)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = sorted(glob.glob(os.path.join(args.images, "*.jp*g")))
+        if args.synthetic:
+            paths.append(write_synthetic_jpeg(tmp))
+        if not paths:
+            print(f"Error: No images found in {args.images}")
+            sys.exit(1)
+
+        results = {}
+        for mode in ("current", "fast"):
+            output = subprocess.check_output(
+                [sys.executable, __file__, "--mode", mode, "--repeat", str(args.repeat), "--paths", *paths]
+            )
+            results[mode] = json.loads(output.decode().strip().splitlines()[-1])
+
+    print(f"{'image':<28} {'current':>10} {'fast':>10} {'speed-up':>9}")
+    for name, current_ms in results["current"]["latencies"].items():
+        fast_ms = results["fast"]["latencies"][name]
+        print(f"{name:<28} {current_ms:>7.1f} ms {fast_ms:>7.1f} ms {current_ms / fast_ms:>8.2f}x")
+    print(f"\nPeak RSS increase: current {results['current']['peak_rss_increase_mb']:.0f} MB, "
+          f"fast {results['fast']['peak_rss_increase_mb']:.0f} MB")
+
+if __name__ == "__main__":
+    main()
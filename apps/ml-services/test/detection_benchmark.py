@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Face Detection Benchmark
+
+Runs the face detection of the DetectionService at different detection resolutions
+(DETECTION_MAX_SIDE) and with tiled detection at different tile sizes (DETECTION_TILE_SIZE),
+and reports latency and recall on a local sample set. A detection counts as a hit if it
+overlaps a labelled face with an IoU of at least --iou.
+
+Labels are read from a JSON file mapping image file names to lists of face boxes
+[x1, y1, x2, y2] in full resolution pixels. Without labels, the detections at full
+resolution serve as ground truth, which shows what downscaling loses compared to before.
+
+Usage (from apps/ml-services):
+    python test/detection_benchmark.py --images test/images
+    python test/detection_benchmark.py --images /data/site-photos --labels /data/site-photos/faces.json --max-sides 0 1920 1280 960 640
+    python test/detection_benchmark.py --images /data/panoramas --labels faces.json --tile-sizes 1024 640 --tile-overlap 128 --tile-workers 4
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import numpy as np
+from PIL import Image
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from app.config import Config
+from app.services.detection_service import DetectionService
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    intersection = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+def count_hits(labels, detections, threshold):
+    """Number of labelled faces matched by a detection (greedy, every detection matches once)"""
+    unmatched = list(detections)
+    hits = 0
+    for label in labels:
+        best = max(unmatched, key=lambda d: iou(label, d), default=None)
+        if best is not None and iou(label, best) >= threshold:
+            unmatched.remove(best)
+            hits += 1
+    return hits
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare face detection latency and recall per detection resolution")
+    parser.add_argument("--images", default=os.path.join(SERVICE_DIR, "test", "images"), help="Directory of sample images")
+    parser.add_argument("--labels", help="JSON file mapping image file names to face boxes [x1, y1, x2, y2]")
+    parser.add_argument("--max-sides", type=int, nargs="+", default=[0, 1920, 1280, 960, 640],
+                        help="Detection resolutions to compare, 0 for the full resolution")
+    parser.add_argument("--tile-sizes", type=int, nargs="*", default=[], help="Tile sizes of tiled detection to compare")
+    parser.add_argument("--tile-overlap", type=int, default=128, help="Overlap of neighbouring tiles in pixels")
+    parser.add_argument("--tile-workers", type=int, default=1, help="Threads detecting tiles in parallel")
+    parser.add_argument("--iou", type=float, default=0.3, help="Minimum IoU of a hit")
+    parser.add_argument("--repeat", type=int, default=3, help="Detections per image and resolution")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.images, "*.jp*g")) + glob.glob(os.path.join(args.images, "*.png")))
+    if not paths:
+        print(f"Error: No images found in {args.images}")
+        sys.exit(1)
+    images = {os.path.basename(path): np.array(Image.open(path).convert("RGB")) for path in paths}
+
+    service = DetectionService()
+    if args.labels:
+        with open(args.labels) as f:
+            labels = {name: [tuple(box) for box in boxes] for name, boxes in json.load(f).items() if name in images}
+        print(f"{len(images)} images, {sum(map(len, labels.values()))} labelled faces\n")
+    else:
+        service.max_side = 0
+        service.tiling = False
+        labels = {name: service.detect_faces(image) for name, image in images.items()}
+        print(f"{len(images)} images, {sum(map(len, labels.values()))} faces found at full resolution "
+              f"(used as ground truth)\n")
+
+    configurations = [(f"max side {max_side or 'full'}", max_side, None) for max_side in args.max_sides]
+    configurations += [(f"tiles {tile_size}", Config.DETECTION_MAX_SIDE, tile_size) for tile_size in args.tile_sizes]
+    service.tile_overlap = args.tile_overlap
+    service.tile_workers = args.tile_workers
+
+    print(f"{'configuration':<16} {'latency':>10} {'recall':>8} {'detections':>11}")
+    for configuration, max_side, tile_size in configurations:
+        service.max_side = max_side
+        service.tiling = tile_size is not None
+        service.tile_size = tile_size or service.tile_size
+        latency_ms = 0.0
+        hits = 0
+        detections = 0
+        for name, image in images.items():
+            service.detect_faces(image)  # warm up
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                regions = service.detect_faces(image)
+            latency_ms += (time.perf_counter() - start) * 1000.0 / args.repeat
+            hits += count_hits(labels.get(name, []), regions, args.iou)
+            detections += len(regions)
+
+        total = sum(len(labels.get(name, [])) for name in images)
+        recall = hits / total if total else 1.0
+        print(f"{configuration:<16} {latency_ms / len(images):>7.1f} ms {recall:>8.3f} {detections:>11}")
+
+if __name__ == "__main__":
+    main()
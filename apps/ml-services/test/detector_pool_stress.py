@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Detector Pool Stress Test
+
+Runs face detection from many threads at once against a fresh DetectionService with a pool of
+--pool-size detectors, like a freshly started threaded gunicorn worker serving concurrent blurring
+requests, so that the threads also race to create the pool.
+Checks that
+  - no detector is ever used by two threads at the same time,
+  - no more than --pool-size detectors are created, even by the concurrent first requests,
+  - every concurrent result equals the sequential result of the same image,
+and reports the throughput and the time threads waited for a free detector.
+Exits with status 1 if a check fails.
+
+Usage (from apps/ml-services):
+    python test/detector_pool_stress.py --images test/images
+    python test/detector_pool_stress.py --threads 16 --pool-size 4 --requests 200
+"""
+
+import argparse
+import glob
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from app.config import Config
+from app.services.detection_service import DetectionService
+from app.utils.metrics import metrics
+
+class GuardedDetector:
+    """Wraps a detector and records it if two threads ever run it at the same time"""
+
+    violations = 0
+
+    def __init__(self, detector):
+        self._detector = detector
+        self._in_use = threading.Lock()
+
+    def process(self, image):
+        if not self._in_use.acquire(blocking=False):
+            GuardedDetector.violations += 1
+            self._in_use.acquire()
+        try:
+            return self._detector.process(image)
+        finally:
+            self._in_use.release()
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the detector pool with concurrent detections")
+    parser.add_argument("--images", default=os.path.join(SERVICE_DIR, "test", "images"), help="Directory of sample images")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent requests")
+    parser.add_argument("--pool-size", type=int, default=4, help="Detectors in the pool")
+    parser.add_argument("--requests", type=int, default=100, help="Total detections")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.images, "*.jp*g")) + glob.glob(os.path.join(args.images, "*.png")))
+    if not paths:
+        print(f"Error: No images found in {args.images}")
+        sys.exit(1)
+    images = [np.array(Image.open(path).convert("RGB")) for path in paths]
+
+    Config.DETECTION_POOL_SIZE = args.pool_size
+    service = DetectionService()
+    created = []
+    create_detector = service._create_face_detector
+
+    def create_guarded_detector():
+        detector = GuardedDetector(create_detector())
+        created.append(detector)
+        return detector
+
+    service._create_face_detector = create_guarded_detector
+
+    # the sequential results come from a separate service, so that the pool of `service` is still cold
+    reference = DetectionService()
+    expected = [reference.detect_faces(image) for image in images]
+
+    mismatches = 0
+    start_together = threading.Barrier(min(args.threads, args.requests))
+    def detect(i):
+        nonlocal mismatches
+        if i < start_together.parties:
+            start_together.wait()  # the first requests reach the cold pool at the same time
+        regions = service.detect_faces(images[i % len(images)])
+        if regions != expected[i % len(images)]:
+            mismatches += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        list(executor.map(detect, range(args.requests)))
+    elapsed = time.perf_counter() - start
+
+    wait = metrics.snapshot()["summaries"].get("detector_pool_wait_ms", {"count": 0, "p50": 0.0, "p95": 0.0})
+    print(f"{args.requests} detections, {args.threads} threads, pool of {args.pool_size}")
+    print(f"Throughput:          {args.requests / elapsed:.1f} images/s")
+    print(f"Detectors created:   {len(created)}")
+    print(f"Waits for detector:  {wait['count']} (p50 {wait['p50']:.1f} ms, p95 {wait['p95']:.1f} ms)")
+    print(f"Concurrent use:      {GuardedDetector.violations}")
+    print(f"Result mismatches:   {mismatches}")
+
+    if GuardedDetector.violations or mismatches or len(created) > args.pool_size:
+        print("FAILED")
+        sys.exit(1)
+    print("ok")
+
+if __name__ == "__main__":
+    main()
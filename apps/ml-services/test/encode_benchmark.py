@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Image Encode Benchmark
+
+Encodes a local sample set with different output encodings of the blurring service and reports
+the mean encode time and output size of each, to pick defaults that balance storage cost against
+CPU time. The fast variants need simplejpeg and are skipped if it is not installed.
+
+Usage (from apps/ml-services):
+    python test/encode_benchmark.py --images test/images
+    python test/encode_benchmark.py --images /data/samples --repeat 5
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from PIL import Image
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from app.utils.image_encoding_utils import EncodingOptions, encode_image
+
+VARIANTS = {
+    "pillow defaults (q75)": EncodingOptions(quality=75),
+    "jpeg q85": EncodingOptions(quality=85),
+    "jpeg q85 optimize": EncodingOptions(quality=85, optimize=True),
+    "jpeg q85 progressive": EncodingOptions(quality=85, optimize=True, progressive=True),
+    "jpeg q85 4:4:4": EncodingOptions(quality=85, subsampling="4:4:4"),
+    "jpeg q95": EncodingOptions(quality=95),
+    "webp q75": EncodingOptions(format="webp", quality=75),
+    "webp q85": EncodingOptions(format="webp", quality=85),
+    "fast jpeg q85": EncodingOptions(quality=85, fast=True),
+    "fast jpeg q95": EncodingOptions(quality=95, fast=True),
+}
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare encode time and output size of the output encodings")
+    parser.add_argument("--images", default=os.path.join(SERVICE_DIR, "test", "images"), help="Directory of sample images")
+    parser.add_argument("--repeat", type=int, default=3, help="Encodes per image and variant")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.images, "*.jp*g")) + glob.glob(os.path.join(args.images, "*.png")))
+    if not paths:
+        print(f"Error: No images found in {args.images}")
+        sys.exit(1)
+    images = [Image.open(path).convert("RGB") for path in paths]
+    source_kb = sum(os.path.getsize(path) for path in paths) / len(paths) / 1024
+
+    try:
+        import simplejpeg  # noqa: F401
+        has_simplejpeg = True
+    except ImportError:
+        has_simplejpeg = False
+        print("simplejpeg is not installed, skipping the fast variants\n")
+
+    print(f"{len(images)} images, mean source size {source_kb:.0f} KB\n")
+    print(f"{'variant':<24} {'encode':>10} {'size':>10} {'vs source':>10}")
+    for name, options in VARIANTS.items():
+        if options.fast and not has_simplejpeg:
+            continue
+        encode_ms = 0.0
+        size_kb = 0.0
+        for image in images:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                output = encode_image(image, options)
+            encode_ms += (time.perf_counter() - start) * 1000.0 / args.repeat
+            size_kb += output.getbuffer().nbytes / 1024
+        encode_ms /= len(images)
+        size_kb /= len(images)
+        print(f"{name:<24} {encode_ms:>7.1f} ms {size_kb:>7.0f} KB {size_kb / source_kb:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+HTTP Client Check
+
+Runs the ImageLoadingService against a local stand-in for MinIO that injects latency,
+5xx responses and dropped connections, and reports how many downloads succeeded, how many
+retries were needed and the latency distribution. Covers the pooled synchronous client
+(concurrent threads, like gunicorn threads) and the prefetching download of batch requests.
+Also checks that a hanging server is cut off by the read timeout.
+
+Usage (from apps/ml-services):
+    python test/http_client_check.py
+    python test/http_client_check.py --requests 200 --threads 16 --failure-rate 0.3 --latency-ms 50
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from PIL import Image
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from app.config import Config
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """Serves the test image after a random delay, fails a share of the requests"""
+
+    protocol_version = "HTTP/1.1"
+    image = b""
+    latency_ms = 0.0
+    failure_rate = 0.0
+
+    def do_GET(self):
+        if self.path == "/hang":
+            time.sleep(Config.HTTP_READ_TIMEOUT + 5)
+            return
+
+        time.sleep(random.uniform(0, 2 * self.latency_ms) / 1000.0)
+        roll = random.random()
+        if roll < self.failure_rate / 2:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif roll < self.failure_rate:
+            self.close_connection = True  # drop the connection without a response
+        else:
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(self.image)))
+            self.end_headers()
+            self.wfile.write(self.image)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(image, latency_ms, failure_rate):
+    FlakyHandler.image = image
+    FlakyHandler.latency_ms = latency_ms
+    FlakyHandler.failure_rate = failure_rate
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def make_image():
+    pixels = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format="JPEG")
+    return output.getvalue()
+
+def report(name, ok, failures, retries, elapsed, latencies=None):
+    line = f"{name:<8} ok {ok:>4}  failed {failures:>3}  retries {retries:>4}  "
+    if latencies:
+        line += f"p50 {np.percentile(latencies, 50):>6.1f} ms  p95 {np.percentile(latencies, 95):>6.1f} ms  "
+    print(line + f"total {elapsed:.2f} s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the pooled HTTP client against a flaky local server")
+    parser.add_argument("--requests", type=int, default=100, help="Downloads per client")
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent threads for the synchronous client")
+    parser.add_argument("--latency-ms", type=float, default=20, help="Mean injected latency")
+    parser.add_argument("--failure-rate", type=float, default=0.2, help="Share of 503s and dropped connections")
+    args = parser.parse_args()
+
+    # Keep the timeout check short
+    Config.HTTP_READ_TIMEOUT = 2.0
+
+    from app.services.image_loading_service import ImageLoadingService, ImageDownloadError
+    from app.utils.metrics import metrics
+
+    image = make_image()
+    server = start_server(image, args.latency_ms, args.failure_rate)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    service = ImageLoadingService()
+
+    print(f"{args.requests} downloads per client, failure rate {args.failure_rate:.0%}, "
+          f"up to {Config.HTTP_MAX_RETRIES} retries\n")
+
+    def retries():
+        return metrics.snapshot()["counters"].get("http_retries", 0)
+
+    def download(i):
+        start = time.perf_counter()
+        try:
+            buffer = service.download_image(f"{base_url}/image-{i}.jpg")
+        except ImageDownloadError:
+            return None
+        assert bytes(buffer.view) == image
+        return (time.perf_counter() - start) * 1000.0
+
+    retries_before = retries()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        results = list(executor.map(download, range(args.requests)))
+    latencies = [r for r in results if r is not None]
+    report("sync", len(latencies), len(results) - len(latencies), retries() - retries_before,
+           time.perf_counter() - start, latencies)
+
+    retries_before = retries()
+    start = time.perf_counter()
+    urls = {str(i): f"{base_url}/image-{i}.jpg" for i in range(args.requests)}
+    results = [result for _, result in service.prefetch_images(urls)]
+    images = [result for result in results if not isinstance(result, ImageDownloadError)]
+    assert all(bytes(buffer.view) == image for buffer in images)
+    report("batch", len(images), len(results) - len(images), retries() - retries_before, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    try:
+        service.download_image(f"{base_url}/hang")
+        print("\nTimeout: FAILED, the hanging request returned")
+    except ImageDownloadError:
+        print(f"\nTimeout: ok, the hanging request failed after {time.perf_counter() - start:.1f} s "
+              f"(read timeout {Config.HTTP_READ_TIMEOUT:.0f} s per attempt)")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
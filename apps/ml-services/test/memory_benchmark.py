@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Gunicorn Memory Benchmark
+
+Starts the service with gunicorn for different worker counts, with and without preloading,
+and reports the memory used by the master and all workers once every worker has loaded its model.
+RSS counts shared pages once per process, PSS divides them between the processes sharing them,
+so the PSS total is the actual memory footprint of the deployment. Linux only.
+
+Usage (from apps/ml-services):
+    SERVICE_TYPE=embedding python test/memory_benchmark.py --workers 1 2 4
+    SERVICE_TYPE=blurring python test/memory_benchmark.py --workers 1 2 4 --port 5002
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import requests
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def read_memory_kb(pid):
+    """Read RSS and PSS of a process in KiB from /proc/<pid>/smaps_rollup"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if parts[0] in ("Rss:", "Pss:"):
+                values[parts[0][:-1].lower()] = int(parts[1])
+    return values["rss"], values["pss"]
+
+def get_children(pid):
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(child) for child in f.read().split()]
+
+def wait_until_settled(master_pid, workers, timeout, interval=2.0):
+    """Wait until all workers are forked and the total memory stopped growing (models loaded)"""
+    deadline = time.time() + timeout
+    last_total = None
+    while time.time() < deadline:
+        time.sleep(interval)
+        children = get_children(master_pid)
+        if len(children) < workers:
+            continue
+        total = sum(read_memory_kb(pid)[0] for pid in [master_pid] + children)
+        if last_total is not None and abs(total - last_total) < 1024:  # < 1 MiB change
+            return children
+        last_total = total
+    raise TimeoutError("Workers did not settle in time")
+
+def measure(workers, preload, port, timeout):
+    env = dict(os.environ, WORKERS=str(workers), PRELOAD=str(preload).lower(), PORT=str(port))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "run:app"],
+        cwd=SERVICE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        children = wait_until_settled(proc.pid, workers, timeout)
+        requests.get(f"http://localhost:{port}/metrics", timeout=10).raise_for_status()
+
+        master_rss, master_pss = read_memory_kb(proc.pid)
+        worker_memory = [read_memory_kb(pid) for pid in children]
+        return {
+            "master_rss": master_rss,
+            "worker_rss": sum(rss for rss, _ in worker_memory) / len(worker_memory),
+            "total_rss": master_rss + sum(rss for rss, _ in worker_memory),
+            "total_pss": master_pss + sum(pss for _, pss in worker_memory),
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure gunicorn memory per worker count")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to measure")
+    parser.add_argument("--port", type=int, default=5001, help="Port used for the benchmarked server")
+    parser.add_argument("--timeout", type=float, default=300, help="Seconds to wait for the workers to load")
+    args = parser.parse_args()
+
+    if not os.getenv("SERVICE_TYPE"):
+        print("Error: SERVICE_TYPE must be set (embedding or blurring)")
+        sys.exit(1)
+
+    print(f"{'workers':>7} {'preload':>7} {'master RSS':>12} {'RSS/worker':>12} {'total RSS':>12} {'total PSS':>12}")
+    for workers in args.workers:
+        for preload in (False, True):
+            result = measure(workers, preload, args.port, args.timeout)
+            print(f"{workers:>7} {str(preload):>7} "
+                  f"{result['master_rss'] / 1024:>9.0f} MB {result['worker_rss'] / 1024:>9.0f} MB "
+                  f"{result['total_rss'] / 1024:>9.0f} MB {result['total_pss'] / 1024:>9.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Image Prefetch Benchmark
+
+Compares downloading and processing remote images one after the other with the prefetching
+pipeline of the ImageLoadingService, which downloads the next images while the current one is
+processed. Images are served by a local HTTP server with injected latency, processing is
+simulated with a fixed delay. Also tracks the bytes held by the pipeline with a slow consumer
+to check the backpressure limit.
+
+Usage (from apps/ml-services):
+    python test/prefetch_benchmark.py
+    python test/prefetch_benchmark.py --images 64 --latency-ms 100 --process-ms 20 --depth 16
+"""
+
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from PIL import Image
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from app.services.image_loading_service import ImageLoadingService
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Serves the test image after a fixed delay"""
+
+    protocol_version = "HTTP/1.1"
+    image = b""
+    latency_ms = 0.0
+    served = 0
+
+    def do_GET(self):
+        SlowHandler.served += 1
+        time.sleep(self.latency_ms / 1000.0)
+        self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("Content-Length", str(len(self.image)))
+        self.end_headers()
+        self.wfile.write(self.image)
+
+    def log_message(self, format, *args):
+        pass
+
+def make_image(width, height):
+    pixels = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format="JPEG", quality=95)
+    return output.getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential and prefetched image downloads")
+    parser.add_argument("--images", type=int, default=32, help="Number of images")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Injected latency per download")
+    parser.add_argument("--process-ms", type=float, default=10, help="Simulated processing time per image")
+    parser.add_argument("--depth", type=int, default=8, help="Concurrent downloads")
+    parser.add_argument("--max-mb", type=float, default=4, help="Budget of buffered bytes for the backpressure check")
+    args = parser.parse_args()
+
+    SlowHandler.image = make_image(1920, 1080)
+    SlowHandler.latency_ms = args.latency_ms
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    urls = {str(i): f"{base_url}/image-{i}.jpg" for i in range(args.images)}
+
+    service = ImageLoadingService()
+    image_size = len(SlowHandler.image)
+    print(f"{args.images} images of {image_size / 1024:.0f} KB, {args.latency_ms:.0f} ms latency, "
+          f"{args.process_ms:.0f} ms processing\n")
+
+    start = time.perf_counter()
+    for url in urls.values():
+        service.download_image(url)
+        time.sleep(args.process_ms / 1000.0)
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    order = []
+    for image_id, _ in service.prefetch_images(urls, depth=args.depth):
+        order.append(image_id)
+        time.sleep(args.process_ms / 1000.0)
+    prefetched = time.perf_counter() - start
+    assert order == list(urls), "prefetch must preserve the input order"
+
+    print(f"sequential  {sequential:6.2f} s")
+    print(f"prefetch    {prefetched:6.2f} s  (depth {args.depth}, speed-up {sequential / prefetched:.1f}x)")
+
+    # Backpressure: with a consumer far slower than the downloads, the images fetched
+    # but not yet consumed must stay within the byte budget plus one round of downloads
+    max_bytes = int(args.max_mb * 1024 * 1024)
+    served_before = SlowHandler.served
+    consumed = 0
+    peak_images = 0
+    for _ in service.prefetch_images(urls, depth=args.depth, max_bytes=max_bytes):
+        consumed += 1
+        time.sleep(2 * args.latency_ms / 1000.0)
+        peak_images = max(peak_images, SlowHandler.served - served_before - consumed)
+    bound = max_bytes + args.depth * image_size
+    peak = peak_images * image_size
+    print(f"\nBackpressure: peak {peak / (1024 * 1024):.1f} MB ahead of the consumer, "
+          f"bound {bound / (1024 * 1024):.1f} MB (budget {args.max_mb:.0f} MB + depth x image size) "
+          f"-> {'ok' if peak <= bound else 'EXCEEDED'}")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
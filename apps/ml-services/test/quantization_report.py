@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Quantisation Accuracy Report
+
+Compares the retrieval rankings of the int8 quantised embedding model against the fp32 model:
+for every query, the sample images are ranked by cosine similarity with both models and the
+rankings are compared (top-k overlap, Spearman rank correlation, top-1 agreement).
+Also reports the similarity of the embeddings themselves and the image embedding latency.
+
+Usage (from apps/ml-services):
+    python test/quantization_report.py --images test/images
+    python test/quantization_report.py --backend onnx --images /data/samples --queries bagger kran betonmischer --k 5
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+import numpy as np
+from PIL import Image
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from transformers import CLIPProcessor
+from app.config import Config
+from app.services.inference_backends import create_backend
+
+DEFAULT_QUERIES = ["bagger", "kran", "betonmischer", "baum", "person", "gerüst", "lkw", "baustelle"]
+
+def normalize(x):
+    return x / np.linalg.norm(x, axis=-1, keepdims=True)
+
+def embed(backend, processor, queries, images, batch_size):
+    text_inputs = processor(text=queries, return_tensors="pt", padding=backend.text_padding)
+    text = normalize(backend.text_features(text_inputs).numpy())
+
+    image_batches = []
+    start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        image_inputs = processor(images=images[i:i + batch_size], return_tensors="pt")
+        image_batches.append(backend.image_features(image_inputs).numpy())
+    latency_ms = (time.perf_counter() - start) * 1000.0 / len(images)
+
+    return text, normalize(np.concatenate(image_batches)), latency_ms
+
+def spearman(a, b):
+    """Spearman rank correlation of two score vectors (without tie correction)"""
+    rank_a = np.argsort(np.argsort(-a))
+    rank_b = np.argsort(np.argsort(-b))
+    n = len(a)
+    if n < 2:
+        return 1.0
+    return 1.0 - 6.0 * np.sum((rank_a - rank_b) ** 2) / (n * (n ** 2 - 1))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare retrieval rankings of the fp32 and int8 models")
+    parser.add_argument("--backend", default=Config.EMBEDDING_BACKEND, help="torch, torchscript or onnx")
+    parser.add_argument("--images", default=os.path.join(SERVICE_DIR, "test", "images"), help="Directory of sample images")
+    parser.add_argument("--queries", nargs="+", default=DEFAULT_QUERIES, help="Search queries")
+    parser.add_argument("--k", type=int, default=3, help="Size of the compared top-k result lists")
+    parser.add_argument("--batch-size", type=int, default=Config.EMBEDDING_BATCH_SIZE, help="Images per forward pass")
+    args = parser.parse_args()
+
+    source = Config.EMBEDDING_MODEL_NAME
+    if os.path.isfile(os.path.join(Config.EMBEDDING_MODEL_PATH, "model.safetensors")):
+        source = Config.EMBEDDING_MODEL_PATH
+
+    paths = sorted(glob.glob(os.path.join(args.images, "*.jp*g")) + glob.glob(os.path.join(args.images, "*.png")))
+    if not paths:
+        print(f"Error: No images found in {args.images}")
+        sys.exit(1)
+    images = [Image.open(path).convert("RGB") for path in paths]
+    k = min(args.k, len(images))
+
+    processor = CLIPProcessor.from_pretrained(source)
+    results = {}
+    for quantize in (False, True):
+        backend = create_backend(args.backend, source, Config.EMBEDDING_MODEL_PATH,
+                                 Config.EMBEDDING_INTRA_OP_THREADS, quantize)
+        results[quantize] = embed(backend, processor, args.queries, images, args.batch_size)
+
+    text_fp32, image_fp32, latency_fp32 = results[False]
+    text_int8, image_int8, latency_int8 = results[True]
+    scores_fp32 = text_fp32 @ image_fp32.T
+    scores_int8 = text_int8 @ image_int8.T
+
+    print(f"Backend: {args.backend}, {len(images)} images, {len(args.queries)} queries, k={k}\n")
+    print(f"{'query':<20} {'top-1':>6} {'top-k overlap':>14} {'spearman':>9}")
+    overlaps, correlations, top1 = [], [], []
+    for i, query in enumerate(args.queries):
+        top_fp32 = np.argsort(-scores_fp32[i])[:k]
+        top_int8 = np.argsort(-scores_int8[i])[:k]
+        overlap = len(set(top_fp32) & set(top_int8)) / k
+        correlation = spearman(scores_fp32[i], scores_int8[i])
+        same_top1 = top_fp32[0] == top_int8[0]
+
+        overlaps.append(overlap)
+        correlations.append(correlation)
+        top1.append(same_top1)
+        print(f"{query:<20} {'yes' if same_top1 else 'NO':>6} {overlap:>14.2f} {correlation:>9.3f}")
+
+    print(f"\nTop-1 agreement:           {np.mean(top1) * 100:.1f}%")
+    print(f"Mean top-{k} overlap:         {np.mean(overlaps):.3f}")
+    print(f"Mean Spearman correlation: {np.mean(correlations):.3f}")
+    print(f"Text embedding cosine:     min {np.min(np.sum(text_fp32 * text_int8, axis=1)):.4f}")
+    print(f"Image embedding cosine:    min {np.min(np.sum(image_fp32 * image_int8, axis=1)):.4f}")
+    print(f"Image latency per image:   fp32 {latency_fp32:.1f} ms, int8 {latency_int8:.1f} ms "
+          f"(speed-up {latency_fp32 / latency_int8:.2f}x)")
+
+if __name__ == "__main__":
+    main()
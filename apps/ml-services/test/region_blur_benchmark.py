@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Region Blur Benchmark
+
+Compares the previous per-region blur loop (one cv2.GaussianBlur per region, overlapping
+regions blurred repeatedly) with the region blur engine (merged regions, one blur per kernel
+group, mask compositing) for 1, 10 and 100 face-sized regions on a camera-sized image,
+either spread randomly or clustered into heavily overlapping groups like a crowd (--layout crowd).
+Also checks that every pixel of every region is blurred by the engine.
+
+Usage (from apps/ml-services):
+    python test/region_blur_benchmark.py
+    python test/region_blur_benchmark.py --counts 1 10 100 500 --layout crowd --feather 8 --repeat 10
+"""
+
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from app.utils.region_blur import blur_regions
+
+def blur_regions_loop(image_np, regions, sigma=30):
+    """The previous BlurringService._blur_regions"""
+    result_img = image_np
+    for (x1, y1, x2, y2) in regions:
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(image_np.shape[1], x2), min(image_np.shape[0], y2)
+        if x2 <= x1 or y2 <= y1:
+            continue
+        roi = result_img[y1:y2, x1:x2]
+        region_size = min(x2 - x1, y2 - y1)
+        adaptive_ksize = min(99, max(11, int(region_size * 0.15)))
+        adaptive_ksize = adaptive_ksize if adaptive_ksize % 2 == 1 else adaptive_ksize + 1
+        result_img[y1:y2, x1:x2] = cv2.GaussianBlur(roi, (adaptive_ksize, adaptive_ksize), sigma)
+    return result_img
+
+def random_regions(count, width, height, rng):
+    """Face-sized boxes spread over the whole image"""
+    regions = []
+    for _ in range(count):
+        size = int(rng.uniform(40, 300))
+        x = int(rng.uniform(0, width - size))
+        y = int(rng.uniform(0, height - size))
+        regions.append((x, y, x + size, y + size))
+    return regions
+
+def crowd_regions(count, width, height, rng):
+    """Heavily overlapping boxes, like a crowd of people or overlapping detections of the same faces"""
+    centers = random_regions(max(1, count // 4), width - 400, height - 400, rng)
+    regions = []
+    for i in range(count):
+        x, y = centers[i % len(centers)][:2]
+        size = int(rng.uniform(80, 200))
+        x += int(rng.uniform(0, 200))
+        y += int(rng.uniform(0, 200))
+        regions.append((x, y, x + size, y + size))
+    return regions
+
+def measure(function, image, regions, repeat, **kwargs):
+    total = 0.0
+    for _ in range(repeat):
+        work = image.copy()
+        start = time.perf_counter()
+        function(work, regions, **kwargs)
+        total += time.perf_counter() - start
+    return total * 1000.0 / repeat, work
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the per-region blur loop with the region blur engine")
+    parser.add_argument("--width", type=int, default=4000, help="Image width")
+    parser.add_argument("--height", type=int, default=3000, help="Image height")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 100], help="Numbers of regions")
+    parser.add_argument("--layout", choices=["random", "crowd"], default="random", help="Placement of the regions")
+    parser.add_argument("--feather", type=int, default=0, help="Feather width of the engine")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (args.height // 8, args.width // 8, 3), dtype=np.uint8)
+    image = cv2.resize(base, (args.width, args.height), interpolation=cv2.INTER_LINEAR)
+    image += rng.integers(0, 16, image.shape, dtype=np.uint8)  # texture, so blurring changes every pixel
+
+    print(f"{args.width}x{args.height} image, {args.layout} regions, feather {args.feather}\n")
+    print(f"{'regions':>8} {'loop':>10} {'engine':>10} {'speed-up':>9} {'coverage':>9}")
+    for count in args.counts:
+        layout = random_regions if args.layout == "random" else crowd_regions
+        regions = layout(count, args.width, args.height, rng)
+        loop_ms, _ = measure(blur_regions_loop, image, regions, args.repeat)
+        engine_ms, result = measure(blur_regions, image, regions, args.repeat, feather=args.feather)
+
+        changed = np.any(result != image, axis=2)
+        covered = np.zeros(changed.shape, dtype=bool)
+        for x1, y1, x2, y2 in regions:
+            covered[y1:y2, x1:x2] = True
+        coverage = changed[covered].mean()
+
+        print(f"{count:>8} {loop_ms:>7.1f} ms {engine_ms:>7.1f} ms {loop_ms / engine_ms:>8.2f}x {coverage:>8.1%}")
+
+if __name__ == "__main__":
+    main()
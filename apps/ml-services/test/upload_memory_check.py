@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Upload Memory Check
+
+Regression check for the upload path of processed images: encodes a large photo into a
+BytesIO like upload_image_and_respond does and uploads it to a local HTTP server with
+ImageLoadingService.upload_image, measuring the peak Python heap allocations (tracemalloc)
+of the upload itself. The body must be streamed from the buffer, so the peak has to stay
+well below the size of the encoded image. The previous path (file_obj.read() before the PUT)
+is measured for comparison. Exits with status 1 if the check fails.
+
+Usage (from apps/ml-services):
+    python test/upload_memory_check.py
+    python test/upload_memory_check.py --megapixels 24 --max-ratio 0.1
+"""
+
+import argparse
+import io
+import os
+import sys
+import threading
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from PIL import Image
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from app.services.image_loading_service import ImageLoadingService
+
+class DiscardingHandler(BaseHTTPRequestHandler):
+    """Accepts PUT requests and discards the body, remembering its size"""
+
+    protocol_version = "HTTP/1.1"
+    received = 0
+
+    def do_PUT(self):
+        remaining = int(self.headers["Content-Length"])
+        DiscardingHandler.received = remaining
+        while remaining > 0:
+            remaining -= len(self.rfile.read(min(remaining, 1024 * 1024)))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+def encode_photo(megapixels):
+    """Encode a noisy photo-sized image as JPEG into a BytesIO, like upload_image_and_respond"""
+    width = int((megapixels * 1e6 * 4 / 3) ** 0.5)
+    height = width * 3 // 4
+    base = np.random.default_rng(0).integers(0, 255, (height // 4, width // 4, 3), dtype=np.uint8)
+    image = Image.fromarray(base).resize((width, height), Image.BILINEAR)
+    img_io = io.BytesIO()
+    image.save(img_io, format="JPEG", quality=95)
+    img_io.seek(0)
+    return img_io
+
+def peak_allocation_mb(function):
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that uploads stream the encoded image without copying it")
+    parser.add_argument("--megapixels", type=float, default=12, help="Size of the test photo")
+    parser.add_argument("--max-ratio", type=float, default=0.25, help="Allowed peak allocation relative to the image size")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DiscardingHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/bucket/blurred.jpg"
+
+    service = ImageLoadingService()
+    img_io = encode_photo(args.megapixels)
+    size_mb = img_io.getbuffer().nbytes / (1024 * 1024)
+
+    def previous():
+        img_io.seek(0)
+        service.session.put(url, data=img_io.read(), headers={"Content-Type": "application/octet-stream"})
+
+    previous()  # warm up the connection pool
+    previous_peak = peak_allocation_mb(previous)
+    streamed_peak = peak_allocation_mb(lambda: service.upload_image(url, img_io))
+    server.shutdown()
+
+    assert DiscardingHandler.received == img_io.getbuffer().nbytes, "incomplete upload"
+    print(f"Encoded image: {size_mb:.1f} MB")
+    print(f"Peak allocation during upload: previous {previous_peak:.1f} MB, streamed {streamed_peak:.1f} MB")
+
+    if streamed_peak > args.max_ratio * size_mb:
+        print(f"FAILED: the upload allocated more than {args.max_ratio:.0%} of the image size")
+        sys.exit(1)
+    print("ok")
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,54 @@
 import os
 import io
 import asyncio
-from flask import Flask, abort, request, Response
+import contextlib
+import functools
+from quart import Quart, abort, request, Response
 from minio import Minio
-from minio.error import S3Error
 import tempfile
 import logging
-from asgiref.wsgi import WsgiToAsgi
+from concurrent.futures import ThreadPoolExecutor
+import urllib3
+from werkzeug.datastructures import ContentRange
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from prefetch import prefetch_objects
+from streaming import ProcessOutputReader, TemporaryFileBody
 
 
-app = Flask(__name__)
+app = Quart(__name__)
+app.config["MAX_CONTENT_LENGTH"] = None  # key lists of long projects exceed the default of 16 MB
+app.config["RESPONSE_TIMEOUT"] = None  # previews are streamed, slow clients must not be cut off after 60 s
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-asgi_app = WsgiToAsgi(app)
+asgi_app = app  # Quart is an ASGI app, served by the UvicornWorker
 
 MINIO_ENDPOINT = os.environ.get("MINIO_ENDPOINT", "minio:9000")
 ACCESS_KEY = os.environ.get("ACCESS_KEY", "minioadmin")
 SECRET_KEY = os.environ.get("SECRET_KEY", "minioadmin")
-client = Minio(MINIO_ENDPOINT, ACCESS_KEY, SECRET_KEY, secure=False)
+# frames downloaded concurrently per export, and the cap on downloaded frames waiting for ffmpeg
+PREFETCH_CONCURRENCY = int(os.environ.get("PREFETCH_CONCURRENCY", "8"))
+PREFETCH_MAX_BYTES = int(os.environ.get("PREFETCH_MAX_BYTES", str(64 * 1024 * 1024)))
+# threads (and pooled connections) for blocking MinIO calls, shared by all exports of a worker
+MINIO_THREADS = int(os.environ.get("MINIO_THREADS", "32"))
+# "file" encodes async exports into a temp file and uploads it afterwards, "stream" uploads
+# fragmented MP4 from ffmpeg's stdout while encoding, without a temp file
+EXPORT_MODE = os.environ.get("EXPORT_MODE", "file")
+UPLOAD_PART_SIZE = 5 * 1024 * 1024  # min 5 MiB part_size
+# bytes per chunk of streamed previews
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", str(256 * 1024)))
+
+# the default client pools only 10 connections per host, so concurrent downloads would reconnect
+http_client = urllib3.PoolManager(
+    maxsize=MINIO_THREADS,
+    timeout=urllib3.Timeout(connect=300, read=300),
+    retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+)
+client = Minio(MINIO_ENDPOINT, ACCESS_KEY, SECRET_KEY, secure=False, http_client=http_client)
+minio_executor = ThreadPoolExecutor(max_workers=MINIO_THREADS, thread_name_prefix="minio")
+
+
+async def run_blocking(function, *args, **kwargs):
+    """Run a blocking call on the MinIO threads, so that the event loop keeps serving other exports"""
+    return await asyncio.get_running_loop().run_in_executor(minio_executor, functools.partial(function, *args, **kwargs))
 
 
 @app.post("/process/async")
@@ -32,19 +64,24 @@ async def process_async():
     input_bucket = request.args.get("input_bucket")
     output_bucket = request.args.get("output_bucket")
     timelapse_name = request.args.get("timelapse_name")
-    if input_bucket is None or output_bucket is None or timelapse_name is None or request.stream is None:
+    if input_bucket is None or output_bucket is None or timelapse_name is None:
         abort(400)
-    if not client.bucket_exists(input_bucket) or not client.bucket_exists(output_bucket):
+    if not await run_blocking(client.bucket_exists, input_bucket) or \
+            not await run_blocking(client.bucket_exists, output_bucket):
         abort(404, "Bucket not found.")
 
-    images = [line for line in request.stream]
-    image_keys = [line.decode('utf-8').strip() for line in images if line.strip()]
+    image_keys = await require_keys(read_keys(request.body))
+
+    if EXPORT_MODE == "stream":
+        await generate(temp_file=None, input_bucket=input_bucket, images=image_keys,
+                       upload_to=(output_bucket, timelapse_name))
+        return Response(status=200)
 
     with tempfile.NamedTemporaryFile(suffix=".mp4") as temp_file:
         await generate(temp_file=temp_file, input_bucket=input_bucket, images=image_keys)
         # upload timelapse
-        client.put_object(output_bucket, timelapse_name, temp_file, -1, content_type="video/mp4",
-                          part_size=5 * 1024 * 1024)  # min 5 MiB part_size
+        await run_blocking(client.put_object, output_bucket, timelapse_name, temp_file, -1, content_type="video/mp4",
+                           part_size=UPLOAD_PART_SIZE)
         return Response(status=200)
 
 
@@ -53,41 +90,109 @@ async def process_sync():
     """
      Query parameters:
      - input_bucket: contains the images to be processed
-     - duration: the desired output duration
+     - duration: the desired output duration in milliseconds
+     - frame_count (optional): the number of lines in the body, so that fetching and encoding
+       start while the body is still being received, instead of after counting the lines
+     - fps (optional): the output frame rate, replaces duration and frame_count
+     Headers:
+     - Range (optional): a single byte range of the encoded preview, answered with 206
      Body: each line contains an object id in the input_bucket
     """
     app.logger.info("Got sync processing request")
     input_bucket = request.args.get("input_bucket")
     duration = request.args.get("duration")
-    if input_bucket is None or duration is None or request.stream is None:
+    frame_count = request.args.get("frame_count")
+    fps = request.args.get("fps")
+    if input_bucket is None or (duration is None and fps is None):
         abort(400)
-    if not client.bucket_exists(input_bucket):
+    if not await run_blocking(client.bucket_exists, input_bucket):
         abort(404, "Bucket not found.")
 
     try:
-        duration_ms = int(duration)
+        duration_ms = int(duration) if duration is not None else None
+        num_images = int(frame_count) if frame_count is not None else None
+        fps = float(fps) if fps is not None else None
     except ValueError:
-        abort(400, "Duration must be a number.")
+        abort(400, "Duration, frame count and fps must be numbers.")
+    if any(value is not None and value <= 0 for value in (duration_ms, num_images, fps)):
+        abort(400, "Duration, frame count and fps must be positive.")
+
+    image_keys = await require_keys(read_keys(request.body))
+    if fps is None:
+        if num_images is None:
+            image_keys = [key async for key in image_keys]  # the frame rate depends on the number of images
+            num_images = len(image_keys)
+        fps = num_images / (duration_ms / 1000.0)
+
+    temp_file = tempfile.NamedTemporaryFile(suffix=".mp4")
+    try:
+        await generate(temp_file=temp_file, input_bucket=input_bucket, images=image_keys, framerate=fps)
+    except BaseException:
+        temp_file.close()
+        raise
+    # stream timelapse, the response body closes (and deletes) the temp file once sent
+    return video_response(temp_file, "preview.mp4")
+
+
+def video_response(temp_file, filename):
+    """Response streaming a video in chunks, or only the byte range requested by a Range header"""
+    body = TemporaryFileBody(temp_file, buffer_size=STREAM_CHUNK_SIZE)
+    response = Response(body, content_type="video/mp4",
+                        headers={"Content-Disposition": f"attachment; filename={filename}"})
+    response.accept_ranges = "bytes"
+    response.content_length = body.size
+    if request.range is not None:
+        byte_range = request.range.range_for_length(body.size)
+        if byte_range is None:
+            temp_file.close()
+            raise RequestedRangeNotSatisfiable(length=body.size)
+        body.begin, body.end = byte_range
+        response.status_code = 206
+        response.content_range = ContentRange("bytes", body.begin, body.end, body.size)
+        response.content_length = body.end - body.begin
+    return response
+
 
-    images = [line for line in request.stream]
-    image_keys = [line.decode('utf-8').strip() for line in images if line.strip()]
-    num_images = len(image_keys)
+async def read_keys(body):
+    """Object ids of a streamed request body, one per non-empty line, decoded as the body arrives"""
+    buffer = b""
+    async for chunk in body:
+        buffer += chunk
+        position = 0
+        while (end := buffer.find(b"\n", position)) != -1:
+            line = buffer[position:end]
+            position = end + 1
+            if line.strip():
+                yield line.decode('utf-8').strip()
+        buffer = buffer[position:]  # only the incomplete last line is kept, continued by the next chunk
+    if buffer.strip():
+        yield buffer.decode('utf-8').strip()
 
-    if num_images == 0:
+
+async def require_keys(keys):
+    """Wait for the first key, so that requests without images are rejected before ffmpeg starts"""
+    first = await anext(keys, None)
+    if first is None:
         abort(400, "No images provided.")
 
-    fps = num_images / (duration_ms / 1000.0)
-    with tempfile.NamedTemporaryFile(suffix=".mp4") as temp_file:
-        await generate(temp_file=temp_file, input_bucket=input_bucket, images=image_keys, framerate=fps)
-        # upload timelapse
-        return Response(
-            temp_file.read(),
-            content_type="video/mp4",
-            headers={"Content-Disposition": "attachment; filename=preview.mp4"}
-        )
+    async def chained():
+        yield first
+        async for key in keys:
+            yield key
+    return chained()
 
 
-async def generate(temp_file, input_bucket, images, framerate=25.0):
+async def generate(temp_file, input_bucket, images, framerate=25.0, upload_to=None):
+    """
+    Encode the images into temp_file, or, with upload_to = (bucket, object name) instead of a temp_file,
+    as fragmented MP4 to ffmpeg's stdout, uploaded in parts while it is encoded
+    """
+    if temp_file is not None:
+        output = [temp_file.name]
+    else:
+        # mp4 cannot be piped, as the index is written at the start after encoding;
+        # fragmented mp4 writes an empty index and an index per fragment instead
+        output = ["-movflags", "frag_keyframe+empty_moov+default_base_moof", "-f", "mp4", "pipe:1"]
     proc = await asyncio.create_subprocess_exec(
         "ffmpeg",
         "-y",  # overwrite temp
@@ -97,8 +202,7 @@ async def generate(temp_file, input_bucket, images, framerate=25.0):
         "-i", "pipe:0",  # pipe to stdin
         "-c:v", "libx264",  # video codec
         "-pix_fmt", "yuv420p",  # pixel format
-        temp_file.name,
-        # cannot pipe mp4 to stdout "-f", "mp4", "pipe:1", # mp4 to stdout
+        *output,
         stdin=asyncio.subprocess.PIPE,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE
@@ -109,13 +213,15 @@ async def generate(temp_file, input_bucket, images, framerate=25.0):
         asyncio.create_task(asyncio.wait_for(proc.wait(), timeout=300))
         # 5min (300 sec) timeout as per non-functional requirements
     ]
+    if upload_to is not None:
+        tasks.append(asyncio.create_task(upload_stdout(proc, *upload_to)))
     done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
     for task in done:
         exception = task.exception()
         if exception is not None:
-            proc.terminate()
-            for task in pending:
-                await task
+            if proc.returncode is None:
+                proc.terminate()
+            await asyncio.gather(*pending, return_exceptions=True)
             if isinstance(exception, KeyError):
                 abort(404, "Object in bucket not found.")
             app.logger.error("An exception occured in an asynchronous task.", exception)
@@ -126,22 +232,32 @@ async def generate(temp_file, input_bucket, images, framerate=25.0):
         abort(500)
 
 
+async def upload_stdout(proc, output_bucket, timelapse_name):
+    """
+    Upload ffmpeg's stdout while it is encoded, on a thread of its own: the upload waits for ffmpeg,
+    which waits for frames downloaded on the MinIO threads, so MINIO_THREADS concurrent uploads
+    on those threads would leave none for the downloads and never finish
+    """
+    loop = asyncio.get_running_loop()
+    reader = ProcessOutputReader(proc, loop)
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="upload")
+    try:
+        await loop.run_in_executor(executor, functools.partial(
+            client.put_object, output_bucket, timelapse_name, reader, -1, content_type="video/mp4",
+            part_size=UPLOAD_PART_SIZE))
+    finally:
+        executor.shutdown(wait=False)  # the thread exits once the upload has finished or failed
+
+
 async def write_stdin(stdin, input_bucket, images):
     try:
-        for image in images:
-            response = None
-            try:
-                response = client.get_object(input_bucket, image)
+        frames = prefetch_objects(client, input_bucket, images, concurrency=PREFETCH_CONCURRENCY,
+                                  max_bytes=PREFETCH_MAX_BYTES, executor=minio_executor)
+        async with contextlib.aclosing(frames):  # cancels the remaining downloads on errors
+            async for data in frames:
                 # pipe data into stdin
+                stdin.write(data)
                 await stdin.drain()  # wait until pipe is ready to receive
-                stdin.write(response.data)  # response is consumed into data by default
-            except S3Error as err:
-                app.logger.exception("The Minio client has thrown an exception.")
-                raise KeyError  # raise key error when cannot retrieve object from existing bucket
-            finally:
-                if response:
-                    response.close()
-                    response.release_conn()
     finally:
         stdin.close()
         await stdin.wait_closed()
@@ -0,0 +1,96 @@
+import asyncio
+import collections
+import logging
+from minio.error import S3Error
+
+logger = logging.getLogger(__name__)
+
+
+def fetch_object(client, bucket, key):
+    """
+    Blocking download of an object into memory, runs on an executor thread.
+    Raises KeyError if the object cannot be retrieved from the bucket.
+    """
+    response = None
+    try:
+        response = client.get_object(bucket, key)
+        return response.data  # response is consumed into data by default
+    except S3Error:
+        logger.exception("The Minio client has thrown an exception.")
+        raise KeyError(key)
+    finally:
+        if response:
+            response.close()
+            response.release_conn()
+
+
+async def prefetch_objects(client, bucket, keys, concurrency=8, max_bytes=64 * 1024 * 1024, executor=None):
+    """
+    Download objects with up to `concurrency` requests in flight and yield their data
+    in the order of `keys`, so that a slow object only delays the objects behind it.
+
+    `keys` may be an iterable or an async iterable, e.g. keys parsed from a request body while it
+    is received. Async keys are read ahead by at most `concurrency` keys, and downloads start as
+    soon as the first keys arrive.
+
+    No further downloads are started while the objects fetched but not yet consumed, plus the
+    downloads in flight (estimated at the mean object size so far), exceed `max_bytes`.
+    At least one download is always in flight, so objects larger than `max_bytes` still pass, and
+    the first `concurrency` downloads start before any object size is known.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=concurrency)
+    reader = asyncio.create_task(_read_keys(keys, queue))
+    pending = collections.deque()
+    fetched_bytes = 0
+    fetched_count = 0
+    exhausted = False
+
+    def buffered_bytes():
+        mean_size = fetched_bytes / fetched_count if fetched_count else 0
+        return sum(len(future.result()) if future.done() and not future.exception() else mean_size
+                   for future in pending)
+
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency and (not pending or buffered_bytes() < max_bytes):
+                if queue.empty() and pending:
+                    break  # deliver the downloaded objects instead of waiting for more keys
+                key = await queue.get()
+                if key is _END:
+                    exhausted = True
+                elif isinstance(key, Exception):
+                    raise key
+                else:
+                    pending.append(loop.run_in_executor(executor, fetch_object, client, bucket, key))
+            if not pending:
+                return
+            data = await pending.popleft()
+            fetched_bytes += len(data)
+            fetched_count += 1
+            yield data
+    finally:
+        reader.cancel()
+        for future in pending:
+            if future.done() and not future.cancelled():
+                future.exception()  # retrieved, so asyncio does not log it
+            else:
+                future.cancel()
+
+
+_END = object()
+
+
+async def _read_keys(keys, queue):
+    """Put the keys into the queue, followed by _END, or by the exception that ended the keys"""
+    try:
+        if hasattr(keys, "__aiter__"):
+            async for key in keys:
+                await queue.put(key)
+        else:
+            for key in keys:
+                await queue.put(key)
+    except Exception as error:
+        await queue.put(error)
+        return
+    await queue.put(_END)
@@ -0,0 +1,60 @@
+import asyncio
+import os
+from quart.wrappers.response import ResponseBody
+
+
+class TemporaryFileBody(ResponseBody):
+    """
+    Response body that sends an open NamedTemporaryFile in chunks, read on a thread,
+    optionally limited to the byte range [begin, end). The file, and with it the temporary
+    file on disk, is closed once the response has been sent.
+    """
+
+    def __init__(self, temp_file, buffer_size=256 * 1024):
+        self.temp_file = temp_file
+        self.buffer_size = buffer_size
+        self.size = os.fstat(temp_file.fileno()).st_size
+        self.begin = 0
+        self.end = self.size
+        self.position = 0
+
+    async def __aenter__(self):
+        await asyncio.to_thread(self.temp_file.seek, self.begin)
+        self.position = self.begin
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        self.temp_file.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.position >= self.end:
+            raise StopAsyncIteration()
+        chunk = await asyncio.to_thread(self.temp_file.read, min(self.buffer_size, self.end - self.position))
+        if not chunk:
+            raise StopAsyncIteration()
+        self.position += len(chunk)
+        return chunk
+
+
+class ProcessOutputReader:
+    """
+    Blocking file-like reader of a subprocess' stdout, for uploading the output of an
+    asyncio subprocess from a thread while the process still writes it. Reading past the end
+    raises OSError if the process failed, so that the upload is aborted instead of completed
+    with truncated data.
+    """
+
+    def __init__(self, proc, loop):
+        self.proc = proc
+        self.loop = loop
+
+    def read(self, size):
+        data = asyncio.run_coroutine_threadsafe(self.proc.stdout.read(size), self.loop).result()
+        if not data:
+            returncode = asyncio.run_coroutine_threadsafe(self.proc.wait(), self.loop).result()
+            if returncode != 0:
+                raise OSError(f"ffmpeg exited with status {returncode}")
+        return data
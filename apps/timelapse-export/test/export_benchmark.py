@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Export Mode Benchmark
+
+Runs async exports of 500 and 5,000 frames through the export service in both export modes:
+  - file:   ffmpeg encodes into a temp file, which is uploaded once encoding has finished
+  - stream: ffmpeg writes fragmented MP4 to its stdout, uploaded in parts while encoding
+against a local MinIO stand-in with --latency seconds per request and an upload bandwidth of
+--upload-mbit, and reports the end-to-end latency of each export. Checks that every uploaded
+timelapse decodes to the expected number of frames, and that a stream export with a missing
+frame fails with 404 without leaving an object or an unfinished multipart upload behind.
+Finally runs --concurrent stream exports at once against a worker with only --minio-threads
+MinIO threads, which must all complete: uploads that wait for ffmpeg must not occupy the threads
+that download its frames.
+Exits with status 1 if a check fails. Needs ffmpeg on the PATH.
+
+Usage (from apps/timelapse-export):
+    python test/export_benchmark.py
+    python test/export_benchmark.py --frames 500 5000 --size 1280x720 --upload-mbit 50 --repeat 3
+    python test/export_benchmark.py --modes stream --frames 500 --concurrent 16 --minio-threads 4
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(SERVICE_DIR, "test"))
+
+from load_test import free_port, render_frames, start_service
+from minio_stand_in import MinioStandIn
+
+
+def export(port, keys, name, timeout=600):
+    query = f"input_bucket=frames&output_bucket=timelapses&timelapse_name={name}"
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/process/async?{query}",
+                                     data="\n".join(keys).encode(), headers={"Content-Type": "text/plain"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+    except urllib.error.HTTPError as error:
+        status = error.code
+    return time.perf_counter() - start, status
+
+
+def count_frames(video):
+    """Number of frames ffmpeg reads from a video, None if it cannot be read"""
+    with tempfile.NamedTemporaryFile(suffix=".mp4") as f:  # a regular mp4 cannot be read from a pipe
+        f.write(video)
+        f.flush()
+        result = subprocess.run(["ffmpeg", "-i", f.name, "-map", "0:v", "-f", "null", "-"], capture_output=True)
+    frames = re.findall(rb"frame=\s*(\d+)", result.stderr)
+    return int(frames[-1]) if result.returncode == 0 and frames else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the end-to-end latency of the export modes")
+    parser.add_argument("--frames", type=int, nargs="+", default=[500, 5000], help="Frames per export")
+    parser.add_argument("--distinct", type=int, default=250, help="Distinct frames, repeated to --frames")
+    parser.add_argument("--size", default="640x360", help="Frame size")
+    parser.add_argument("--latency", type=float, default=0.005, help="Seconds added to every MinIO request")
+    parser.add_argument("--upload-mbit", type=float, default=100.0, help="Upload bandwidth of MinIO in Mbit/s")
+    parser.add_argument("--modes", nargs="+", choices=["file", "stream"], default=["file", "stream"],
+                        help="Export modes to compare")
+    parser.add_argument("--repeat", type=int, default=1, help="Exports per mode and frame count")
+    parser.add_argument("--concurrent", type=int, default=8, help="Concurrent stream exports, 0 to skip")
+    parser.add_argument("--minio-threads", type=int, default=4, help="MinIO threads of the concurrent stream worker")
+    args = parser.parse_args()
+
+    stand_in = MinioStandIn(latency=args.latency, upload_bandwidth=args.upload_mbit * 1000 * 1000 / 8)
+    stand_in.create_bucket("timelapses")
+    distinct = []
+    for i, frame in enumerate(render_frames(args.distinct, args.size)):
+        distinct.append(f"frame-{i:05d}.jpg")
+        stand_in.put("frames", distinct[-1], frame)
+
+    failed = False
+    print(f"frames of {args.size}, {args.latency * 1000:.0f} ms MinIO latency, "
+          f"{args.upload_mbit:.0f} Mbit/s upload\n")
+    print(f"{'mode':<8} {'frames':>7} {'latency':>9} {'size':>9} {'decoded':>8}")
+    for mode in args.modes:
+        port = free_port()
+        service = start_service(port, stand_in.endpoint, EXPORT_MODE=mode)
+        try:
+            for frames in args.frames:
+                keys = [distinct[i % len(distinct)] for i in range(frames)]
+                for i in range(args.repeat):
+                    latency, status = export(port, keys, f"{mode}-{frames}-{i}.mp4")
+                    video = stand_in.buckets["timelapses"].pop(f"{mode}-{frames}-{i}.mp4", b"")
+                    decoded = count_frames(video) if status == 200 else None
+                    failed |= decoded != frames
+                    print(f"{mode:<8} {frames:>7} {latency:>7.2f} s {len(video) / (1024 * 1024):>6.1f} MB "
+                          f"{decoded if decoded is not None else 'FAILED':>8}")
+
+            if mode == "stream":
+                _, status = export(port, keys[:100] + ["missing.jpg"] + keys[100:], "missing.mp4")
+                leftover = "missing.mp4" in stand_in.buckets["timelapses"] or bool(stand_in.uploads)
+                failed |= status != 404 or leftover
+                print(f"\nMissing frame: {status}, {'object or upload left behind' if leftover else 'nothing uploaded'}")
+        finally:
+            service.terminate()
+            service.wait()
+
+    if args.concurrent and "stream" in args.modes:
+        frames = min(args.frames)
+        keys = [distinct[i % len(distinct)] for i in range(frames)]
+        port = free_port()
+        service = start_service(port, stand_in.endpoint, EXPORT_MODE="stream", MINIO_THREADS=str(args.minio_threads))
+        try:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrent) as executor:
+                results = list(executor.map(lambda i: export(port, keys, f"concurrent-{i}.mp4", timeout=120),
+                                            range(args.concurrent)))
+            elapsed = time.perf_counter() - start
+        except OSError:  # timed out, the exports are stuck
+            results, elapsed = [], time.perf_counter() - start
+        finally:
+            service.terminate()
+            service.wait()
+        completed = sum(status == 200 and count_frames(stand_in.buckets["timelapses"].pop(f"concurrent-{i}.mp4", b""))
+                        == frames for i, (_, status) in enumerate(results))
+        failed |= completed != args.concurrent
+        print(f"\n{args.concurrent} concurrent stream exports of {frames} frames, {args.minio_threads} MinIO threads: "
+              f"{completed} completed in {elapsed:.2f} s")
+
+    stand_in.close()
+    if failed:
+        print("FAILED")
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
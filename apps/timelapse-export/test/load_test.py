@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Export Load Test
+
+Starts the export service as a single uvicorn worker against a local MinIO stand-in that
+delays every request by --latency seconds, sends --exports export requests with 1, 4, 16, ...
+of them in flight at once, and reports the exports per second of the worker and the latency
+of the requests. With blocking calls on the event loop, the throughput stays flat as the
+concurrency grows; if exports progress concurrently, it grows until ffmpeg saturates the CPUs.
+Checks that every export succeeds (and, for the async endpoint, that the timelapse was uploaded).
+Exits with status 1 if a check fails. Needs ffmpeg on the PATH.
+
+Usage (from apps/timelapse-export):
+    python test/load_test.py
+    python test/load_test.py --endpoint sync --frames 200 --concurrency 1 8 32 --exports 64
+"""
+
+import argparse
+import glob
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(SERVICE_DIR, "test"))
+
+from minio_stand_in import MinioStandIn
+
+
+def render_frames(count, size):
+    """Distinct JPEG frames of an ffmpeg test pattern, with noise like camera frames"""
+    with tempfile.TemporaryDirectory() as directory:
+        subprocess.run(["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", f"testsrc=size={size}:rate=25",
+                        "-vf", "noise=alls=20:allf=t", "-frames:v", str(count),
+                        os.path.join(directory, "%05d.jpg")], check=True)
+        frames = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.jpg"))):
+            with open(path, "rb") as f:
+                frames.append(f.read())
+        return frames
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_service(port, minio_endpoint, **env):
+    env = dict(os.environ, MINIO_ENDPOINT=minio_endpoint, **env)
+    service = subprocess.Popen([sys.executable, "-m", "uvicorn", "app:asgi_app", "--port", str(port),
+                                "--log-level", "warning"], cwd=SERVICE_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return service
+        except OSError:
+            time.sleep(0.1)
+    service.kill()
+    raise RuntimeError("The service did not start")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the concurrent export throughput of one worker")
+    parser.add_argument("--endpoint", choices=["async", "sync"], default="async", help="Export endpoint")
+    parser.add_argument("--frames", type=int, default=100, help="Frames per export")
+    parser.add_argument("--size", default="640x360", help="Frame size")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every MinIO request")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Exports in flight")
+    parser.add_argument("--exports", type=int, default=16, help="Exports per concurrency level")
+    args = parser.parse_args()
+
+    stand_in = MinioStandIn(latency=args.latency)
+    stand_in.create_bucket("timelapses")
+    keys = []
+    for i, frame in enumerate(render_frames(args.frames, args.size)):
+        keys.append(f"frame-{i:05d}.jpg")
+        stand_in.put("frames", keys[-1], frame)
+    body = "\n".join(keys).encode()
+
+    port = free_port()
+    service = start_service(port, stand_in.endpoint)
+
+    def export(i):
+        if args.endpoint == "async":
+            query = f"input_bucket=frames&output_bucket=timelapses&timelapse_name=export-{i}.mp4"
+        else:
+            query = f"input_bucket=frames&duration={args.frames * 40}&frame_count={args.frames}"
+        request = urllib.request.Request(f"http://127.0.0.1:{port}/process/{args.endpoint}?{query}", data=body,
+                                         headers={"Content-Type": "text/plain"})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=600) as response:
+                video = response.read()
+                ok = response.status == 200
+        except urllib.error.HTTPError:
+            ok, video = False, b""
+        if args.endpoint == "async":
+            ok = ok and len(stand_in.buckets["timelapses"].pop(f"export-{i}.mp4", b"")) > 0
+        else:
+            ok = ok and len(video) > 0
+        return time.perf_counter() - start, ok
+
+    failed = False
+    try:
+        print(f"{args.endpoint} exports of {args.frames} frames ({args.size}), "
+              f"{args.latency * 1000:.0f} ms MinIO latency, one worker\n")
+        print(f"{'in flight':>9} {'exports/s':>10} {'p50':>9} {'p95':>9} {'failed':>7}")
+        for concurrency in args.concurrency:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as executor:
+                results = list(executor.map(export, range(args.exports)))
+            elapsed = time.perf_counter() - start
+            latencies = [latency for latency, _ in results]
+            failures = sum(not ok for _, ok in results)
+            failed |= failures > 0
+            print(f"{concurrency:>9} {args.exports / elapsed:>10.2f} {percentile(latencies, 0.5):>7.2f} s "
+                  f"{percentile(latencies, 0.95):>7.2f} s {failures:>7}")
+    finally:
+        service.terminate()
+        service.wait()
+        stand_in.close()
+
+    if failed:
+        print("FAILED")
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Local MinIO stand-in for the tests of the export service
+
+Serves the parts of the S3 API that the export service uses (bucket lookup, object
+download, single and multipart upload) from memory, over HTTP on a local port, so that
+the real Minio client (connection pool, retries) is exercised.
+Every request is delayed by `latency` seconds to simulate the round trip to the object store,
+and uploads are slowed down to `upload_bandwidth` bytes per second if given.
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import uuid
+from urllib.parse import parse_qs, unquote, urlsplit
+import urllib3
+from minio import Minio
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default of 5 drops bursts of new connections
+
+
+class MinioStandIn:
+    def __init__(self, latency=0.0, upload_bandwidth=None):
+        self.latency = latency
+        self.upload_bandwidth = upload_bandwidth
+        self.buckets = {}
+        self.requests = 0
+        self.uploads = {}
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like MinIO
+
+            def log_message(self, format, *args):
+                pass
+
+            def _parse(self):
+                with stand_in._lock:
+                    stand_in.requests += 1
+                time.sleep(stand_in.latency)
+                url = urlsplit(self.path)
+                bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+                query = {name: values[0] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+                return bucket, key, query
+
+            def _read_body(self):
+                data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if stand_in.upload_bandwidth:
+                    time.sleep(len(data) / stand_in.upload_bandwidth)
+                return data
+
+            def _send(self, status, body=b"", content_type="application/xml"):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def do_HEAD(self):
+                bucket, key, _ = self._parse()
+                if bucket not in stand_in.buckets or (key and key not in stand_in.buckets[bucket]):
+                    self._send(404)
+                else:
+                    self._send(200)
+
+            def do_GET(self):
+                bucket, key, query = self._parse()
+                if "location" in query:
+                    self._send(200, b"<LocationConstraint>us-east-1</LocationConstraint>")
+                    return
+                data = stand_in.buckets.get(bucket, {}).get(key)
+                if data is None:
+                    body = (f"<Error><Code>NoSuchKey</Code><Message>Not found</Message>"
+                            f"<Key>{key}</Key><BucketName>{bucket}</BucketName></Error>").encode()
+                    self._send(404, body)
+                else:
+                    self._send(200, data, "application/octet-stream")
+
+            def do_PUT(self):
+                bucket, key, query = self._parse()
+                data = self._read_body()
+                if "uploadId" in query:
+                    stand_in.uploads[query["uploadId"]][int(query["partNumber"])] = data
+                else:
+                    stand_in.put(bucket, key, data)
+                self.send_response(200)
+                self.send_header("ETag", f'"{uuid.uuid4().hex}"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_DELETE(self):
+                _, _, query = self._parse()
+                stand_in.uploads.pop(query.get("uploadId"), None)  # abort of a multipart upload
+                self._send(204)
+
+            def do_POST(self):
+                bucket, key, query = self._parse()
+                self._read_body()
+                if "uploads" in query:
+                    upload_id = uuid.uuid4().hex
+                    stand_in.uploads[upload_id] = {}
+                    body = f"<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>"
+                else:
+                    parts = stand_in.uploads.pop(query["uploadId"])
+                    stand_in.put(bucket, key, b"".join(parts[number] for number in sorted(parts)))
+                    body = (f"<CompleteMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{key}</Key>"
+                            f"<ETag>\"{uuid.uuid4().hex}\"</ETag></CompleteMultipartUploadResult>")
+                self._send(200, body.encode())
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def endpoint(self):
+        return f"127.0.0.1:{self._server.server_address[1]}"
+
+    def client(self, pool_size=10):
+        """Minio client of the stand-in, with `pool_size` pooled connections"""
+        http_client = urllib3.PoolManager(maxsize=pool_size, retries=urllib3.Retry(total=0))
+        return Minio(self.endpoint, "minioadmin", "minioadmin", secure=False, region="us-east-1",
+                     http_client=http_client)
+
+    def put(self, bucket, key, data):
+        self.buckets.setdefault(bucket, {})[key] = data
+
+    def create_bucket(self, bucket):
+        self.buckets.setdefault(bucket, {})
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Frame Prefetch Benchmark
+
+Downloads the frames of a timelapse from a local MinIO stand-in that delays every request
+by --latency seconds, once one frame at a time like the previous write_stdin and once through
+prefetch_objects at different concurrencies, with a consumer that takes --consume-ms per frame
+like ffmpeg reading its stdin. Reports the frame throughput and the peak of downloaded bytes
+not yet consumed, and checks that the frames arrive complete and in order and that a missing
+frame raises KeyError. Exits with status 1 if a check fails.
+
+Usage (from apps/timelapse-export):
+    python test/prefetch_benchmark.py
+    python test/prefetch_benchmark.py --frames 3000 --latency 0.02 --concurrency 1 8 32 --max-bytes 8388608
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.join(SERVICE_DIR, "test"))
+
+from minio_stand_in import MinioStandIn
+from prefetch import fetch_object, prefetch_objects
+
+
+class CountingClient:
+    """Counts the bytes downloaded through a Minio client"""
+
+    def __init__(self, client):
+        self._client = client
+        self._lock = threading.Lock()
+        self.downloaded = 0
+
+    def get_object(self, bucket, key):
+        response = self._client.get_object(bucket, key)
+        with self._lock:
+            self.downloaded += len(response.data)
+        return response
+
+
+def sequential(client, bucket, keys, consume_s):
+    """The previous write_stdin: one blocking download per frame, then the next"""
+    frames = []
+    for key in keys:
+        frames.append(fetch_object(client, bucket, key))
+        time.sleep(consume_s)
+    return frames, 0
+
+
+async def prefetched(client, bucket, keys, consume_s, concurrency, max_bytes, executor):
+    frames = []
+    consumed = 0
+    peak = 0
+    async for data in prefetch_objects(client, bucket, keys, concurrency=concurrency, max_bytes=max_bytes,
+                                       executor=executor):
+        peak = max(peak, client.downloaded - consumed)
+        frames.append(data)
+        consumed += len(data)
+        await asyncio.sleep(consume_s)
+    return frames, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sequential frame downloads with the prefetcher")
+    parser.add_argument("--frames", type=int, default=300, help="Frames of the timelapse")
+    parser.add_argument("--frame-size", type=int, default=200 * 1024, help="Bytes per frame")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds added to every request")
+    parser.add_argument("--consume-ms", type=float, default=1.0, help="Milliseconds the consumer takes per frame")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16, 32],
+                        help="Downloads in flight to compare")
+    parser.add_argument("--max-bytes", type=int, default=64 * 1024 * 1024, help="Cap on buffered bytes")
+    args = parser.parse_args()
+
+    logging.disable(logging.ERROR)  # the missing frame is logged with its traceback
+    stand_in = MinioStandIn(latency=args.latency)
+    keys = [f"frame-{i:05d}.jpg" for i in range(args.frames)]
+    expected = []
+    for key in keys:
+        data = key.encode().ljust(args.frame_size, b"\0")
+        stand_in.put("frames", key, data)
+        expected.append(data)
+
+    pool_size = max(args.concurrency)
+    executor = ThreadPoolExecutor(max_workers=pool_size)
+    consume_s = args.consume_ms / 1000.0
+    failed = False
+
+    print(f"{args.frames} frames of {args.frame_size // 1024} KB, {args.latency * 1000:.0f} ms latency, "
+          f"cap {args.max_bytes // (1024 * 1024)} MB\n")
+    print(f"{'mode':<16} {'time':>9} {'frames/s':>9} {'peak buffered':>14} {'in order':>9}")
+
+    runs = [("sequential", None)] + [(f"prefetch x{c}", c) for c in args.concurrency]
+    for name, concurrency in runs:
+        client = CountingClient(stand_in.client(pool_size))
+        start = time.perf_counter()
+        if concurrency is None:
+            frames, peak = sequential(client, "frames", keys, consume_s)
+        else:
+            frames, peak = asyncio.run(prefetched(client, "frames", keys, consume_s, concurrency,
+                                                  args.max_bytes, executor))
+        elapsed = time.perf_counter() - start
+        in_order = frames == expected
+        failed |= not in_order
+        print(f"{name:<16} {elapsed:>7.2f} s {args.frames / elapsed:>9.1f} "
+              f"{peak / (1024 * 1024):>11.1f} MB {'yes' if in_order else 'NO':>9}")
+
+    async def fetch_missing():
+        async for _ in prefetch_objects(stand_in.client(), "frames", keys[:3] + ["missing.jpg"] + keys[3:],
+                                        executor=executor):
+            pass
+
+    try:
+        asyncio.run(fetch_missing())
+        print("\nMissing frame: no error")
+        failed = True
+    except KeyError:
+        print("\nMissing frame: KeyError")
+
+    executor.shutdown()
+    stand_in.close()
+    if failed:
+        print("FAILED")
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()